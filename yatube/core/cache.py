@@ -0,0 +1,250 @@
+"""Кэш в файле SQLite, общий для всех процессов-воркеров на сервере.
+
+База работает в режиме WAL: читатели не блокируют писателя, а запись
+сериализуется самой SQLite, поэтому incr и add атомарны между
+процессами. Размер ограничен числом записей (MAX_ENTRIES) и объёмом
+значений в байтах (MAX_SIZE); при переполнении вытесняются давно не
+читанные записи (приближённый LRU: время доступа обновляется не чаще
+раза в TOUCH_INTERVAL секунд, чтобы чтение не превращалось в запись).
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {'MAX_ENTRIES': 100000, 'MAX_SIZE': 256 * 2 ** 20},
+        }
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+TOUCH_INTERVAL = 10
+# Ограничение SQLite на число параметров запроса
+CHUNK_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache_entry (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_entry_accessed ON cache_entry (accessed);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats (id, entries, size) VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_entry_insert
+AFTER INSERT ON cache_entry BEGIN
+    UPDATE cache_stats SET entries = entries + 1,
+                           size = size + length(NEW.value);
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_update
+AFTER UPDATE OF value ON cache_entry BEGIN
+    UPDATE cache_stats SET size = size + length(NEW.value)
+                                       - length(OLD.value);
+END;
+CREATE TRIGGER IF NOT EXISTS cache_entry_delete
+AFTER DELETE ON cache_entry BEGIN
+    UPDATE cache_stats SET entries = entries - 1,
+                           size = size - length(OLD.value);
+END;
+"""
+
+UPSERT = """
+INSERT INTO cache_entry (key, value, expires, accessed)
+VALUES (?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET value = excluded.value,
+                                expires = excluded.expires,
+                                accessed = excluded.accessed
+"""
+
+
+def _chunks(items):
+    for start in range(0, len(items), CHUNK_SIZE):
+        yield items[start:start + CHUNK_SIZE]
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = int(options.get('MAX_SIZE', 0)) or None
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        # Соединение на поток; после fork - новое
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self._path, timeout=30,
+                                         isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(SCHEMA)
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    @contextmanager
+    def _write(self):
+        # BEGIN IMMEDIATE берёт блокировку записи сразу, а не при первом
+        # UPDATE, поэтому чтение-изменение-запись атомарно
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            yield db
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _dumps(self, value):
+        return pickle.dumps(value, self.pickle_protocol)
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _alive(self, expires, now):
+        return expires is None or expires > now
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        now = time.time()
+        with self._write() as db:
+            row = db.execute('SELECT expires FROM cache_entry WHERE key = ?',
+                             (key,)).fetchone()
+            if row is not None and self._alive(row[0], now):
+                return False
+            db.execute(UPSERT, (key, self._dumps(value),
+                                self._expires(timeout), now))
+            self._cull(db)
+        return True
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._get_many([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        return {keys[key]: value
+                for key, value in self._get_many(list(keys)).items()}
+
+    def _get_many(self, keys):
+        now = time.time()
+        found, stale, expired = {}, [], []
+        for chunk in _chunks(keys):
+            rows = self._db.execute(
+                'SELECT key, value, expires, accessed FROM cache_entry '
+                f'WHERE key IN ({", ".join("?" * len(chunk))})', chunk)
+            for key, value, expires, accessed in rows:
+                if not self._alive(expires, now):
+                    expired.append(key)
+                    continue
+                found[key] = pickle.loads(value)
+                if now - accessed > TOUCH_INTERVAL:
+                    stale.append(key)
+        if stale or expired:
+            with self._write() as db:
+                db.executemany(
+                    'UPDATE cache_entry SET accessed = ? WHERE key = ?',
+                    ((now, key) for key in stale))
+                db.executemany(
+                    'DELETE FROM cache_entry WHERE key = ? '
+                    'AND expires IS NOT NULL AND expires <= ?',
+                    ((key, now) for key in expired))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        expires = self._expires(timeout)
+        rows = [(self._key(key, version), self._dumps(value), expires, now)
+                for key, value in data.items()]
+        with self._write() as db:
+            db.executemany(UPSERT, rows)
+            self._cull(db)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._write() as db:
+            return db.execute(
+                'UPDATE cache_entry SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self._expires(timeout), key, time.time())).rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        with self._write() as db:
+            row = db.execute(
+                'SELECT value, expires FROM cache_entry WHERE key = ?',
+                (key,)).fetchone()
+            if row is None or not self._alive(row[1], time.time()):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            db.execute('UPDATE cache_entry SET value = ? WHERE key = ?',
+                       (self._dumps(value), key))
+        return value
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        with self._write() as db:
+            for chunk in _chunks(keys):
+                db.execute(
+                    'DELETE FROM cache_entry '
+                    f'WHERE key IN ({", ".join("?" * len(chunk))})', chunk)
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._db.execute(
+            'SELECT expires FROM cache_entry WHERE key = ?',
+            (key,)).fetchone()
+        return row is not None and self._alive(row[0], time.time())
+
+    def clear(self):
+        with self._write() as db:
+            db.execute('DELETE FROM cache_entry')
+
+    def _cull(self, db):
+        entries, size = db.execute(
+            'SELECT entries, size FROM cache_stats').fetchone()
+        over_size = self._max_size is not None and size > self._max_size
+        if entries <= self._max_entries and not over_size:
+            return
+        db.execute('DELETE FROM cache_entry '
+                   'WHERE expires IS NOT NULL AND expires <= ?',
+                   (time.time(),))
+        # Как и встроенные бэкенды, вытесняем 1/CULL_FREQUENCY записей
+        # (при CULL_FREQUENCY = 0 - все), начиная с давно не читанных
+        victims = max(entries // self._cull_frequency
+                      if self._cull_frequency else entries, 1)
+        while True:
+            deleted = db.execute(
+                'DELETE FROM cache_entry WHERE key IN ('
+                'SELECT key FROM cache_entry ORDER BY accessed LIMIT ?)',
+                (victims,)).rowcount
+            size = db.execute('SELECT size FROM cache_stats').fetchone()[0]
+            if (not deleted or self._max_size is None
+                    or size <= self._max_size):
+                break
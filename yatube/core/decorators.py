@@ -0,0 +1,10 @@
+def query_budget(max_queries):
+    """Объявляет, сколько запросов к базе может сделать представление.
+
+    Лимит проверяет core.middleware.QueryBudgetMiddleware и тесты
+    (posts.tests.utils.QueryBudgetMixin).
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
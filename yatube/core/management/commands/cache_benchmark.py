@@ -0,0 +1,91 @@
+import multiprocessing
+import random
+import shutil
+import tempfile
+import time
+
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand
+
+from core.cache import SQLiteCache
+
+COUNTER_KEY = 'benchmark:counter'
+
+
+def _backends(directory, max_entries):
+    params = {'OPTIONS': {'MAX_ENTRIES': max_entries}}
+    return {
+        'LocMemCache': lambda: LocMemCache('benchmark', params),
+        'FileBasedCache': lambda: FileBasedCache(
+            f'{directory}/files', params),
+        'SQLiteCache': lambda: SQLiteCache(
+            f'{directory}/cache.sqlite3', params),
+    }
+
+
+def _work(factory, keys, operations, seed, results):
+    """Читает и пишет как воркер: промах - «рендер» и запись в кэш."""
+    cache = factory()
+    rng = random.Random(seed)
+    hits = increments = 0
+    started = time.perf_counter()
+    for _ in range(operations):
+        choice = rng.random()
+        if choice < 0.05:
+            increments += 1
+            try:
+                cache.incr(COUNTER_KEY)
+            except ValueError:
+                # LocMemCache у каждого процесса свой
+                cache.add(COUNTER_KEY, 1, None)
+            continue
+        key = f'benchmark:{rng.randrange(keys)}'
+        if cache.get(key) is not None:
+            hits += 1
+        else:
+            cache.set(key, 'x' * 512, None)
+    results.put((time.perf_counter() - started, hits, increments))
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает бэкенды кэша под нагрузкой из нескольких '
+            'процессов: скорость, долю попаданий и точность incr')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=4)
+        parser.add_argument('--operations', type=int, default=5000,
+                            help='операций на процесс')
+        parser.add_argument('--keys', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        operations = options['operations']
+        context = multiprocessing.get_context('fork')
+        directory = tempfile.mkdtemp()
+        try:
+            for name, factory in _backends(directory,
+                                           options['keys'] * 2).items():
+                factory().set(COUNTER_KEY, 0, None)
+                results = context.Queue()
+                workers = [
+                    context.Process(target=_work, args=(
+                        factory, options['keys'], operations, seed, results))
+                    for seed in range(processes)]
+                for worker in workers:
+                    worker.start()
+                stats = [results.get() for _ in workers]
+                for worker in workers:
+                    worker.join()
+                elapsed = max(seconds for seconds, _, _ in stats)
+                increments = sum(count for _, _, count in stats)
+                reads = operations * processes - increments
+                hits = sum(hit for _, hit, _ in stats)
+                # Для LocMemCache родитель видит только свою копию
+                counter = factory().get(COUNTER_KEY)
+                self.stdout.write(
+                    f'{name:15} {operations * processes / elapsed:10.0f} '
+                    f'оп/с  попаданий {hits / reads:6.1%}  '
+                    f'incr {counter}/{increments}')
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+_local = threading.local()
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    """Обёртка execute_wrapper: считает запросы и время в базе."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        if getattr(_local, 'outside_budget', False):
+            return execute(sql, params, many, context)
+        start = time.monotonic()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.monotonic() - start
+            self.count += 1
+
+
+@contextmanager
+def outside_query_budget():
+    """Запросы внутри блока не входят в лимит представления: так
+    считается фоновая работа, которую пришлось выполнить в потоке
+    запроса."""
+    previous = getattr(_local, 'outside_budget', False)
+    _local.outside_budget = True
+    try:
+        yield
+    finally:
+        _local.outside_budget = previous
+
+
+def get_query_budget(request):
+    """Лимит запросов представления (core.decorators.query_budget)."""
+    match = request.resolver_match
+    if match is None:
+        return None
+    return getattr(match.func, 'query_budget', None)
+
+
+class QueryBudgetMiddleware:
+    """Считает запросы к базе и их время на каждый запрос.
+
+    Подключается по желанию - первой в MIDDLEWARE (так в тестах,
+    yatube.settings_test). Если представление объявило лимит и
+    превысило его, пишется предупреждение, а при
+    QUERY_BUDGET_STRICT = True поднимается QueryBudgetExceeded. Итог
+    отдаётся в заголовке Server-Timing только при DEBUG или
+    QUERY_BUDGET_SERVER_TIMING: иначе любой клиент видел бы время
+    работы базы.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            response = self.get_response(request)
+        if settings.DEBUG or getattr(settings, 'QUERY_BUDGET_SERVER_TIMING',
+                                     False):
+            response['Server-Timing'] = (
+                f'db;dur={counter.duration * 1000:.1f};'
+                f'desc="{counter.count} queries"'
+            )
+        budget = get_query_budget(request)
+        if budget is not None and counter.count > budget:
+            message = (
+                f'{request.method} {request.path}: {counter.count} '
+                f'запросов при лимите {budget} '
+                f'({counter.duration * 1000:.1f} мс)'
+            )
+            if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.cache import SQLiteCache
+from core.views import IMMUTABLE_CACHE_CONTROL, IMMUTABLE_MEDIA, media
+
+NGINX_MEDIA_CONF = os.path.join(os.path.dirname(settings.BASE_DIR),
+                                'deploy', 'nginx', 'yatube-media.conf')
+
+
+def _increment(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = f'{self.directory}/cache.sqlite3'
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_get_set_add_delete(self):
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 2))
+        self.assertTrue(self.cache.add('other', 2))
+        self.cache.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('key', 'default'), 'default')
+
+    def test_get_many_set_many(self):
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(self.cache.get_many(['a', 'b', 'c']),
+                         {'a': 1, 'b': 2})
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_expired_entries_are_missing(self):
+        self.cache.set('key', 1, timeout=0.01)
+        time.sleep(0.02)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertFalse(self.cache.has_key('key'))
+        self.assertTrue(self.cache.add('key', 2))
+
+    def test_incr_missing_key_raises(self):
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_shared_between_instances(self):
+        self.cache.set('key', 1)
+        self.assertEqual(self.make_cache().get('key'), 1)
+
+    def test_incr_is_atomic_across_processes(self):
+        self.cache.set('counter', 0)
+        context = multiprocessing.get_context('fork')
+        workers = [context.Process(target=_increment,
+                                   args=(self.location, 50))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 200)
+
+    def test_cull_evicts_least_recently_used(self):
+        cache = self.make_cache(MAX_ENTRIES=4, CULL_FREQUENCY=2)
+        for number in range(4):
+            cache.set(f'key{number}', number)
+        cache._db.execute('UPDATE cache_entry SET accessed = 0 '
+                          "WHERE key LIKE '%key0' OR key LIKE '%key1'")
+        cache.set('key4', 4)
+        self.assertEqual(cache.get_many([f'key{n}' for n in range(5)]),
+                         {'key2': 2, 'key3': 3, 'key4': 4})
+
+    def test_cull_keeps_size_under_limit(self):
+        cache = self.make_cache(MAX_SIZE=4096)
+        for number in range(20):
+            cache.set(f'key{number}', 'x' * 1000)
+        size = cache._db.execute(
+            'SELECT sum(length(value)) FROM cache_entry').fetchone()[0]
+        self.assertLessEqual(size, 4096)
+        self.assertIsNotNone(cache.get('key19'))
+
+
+class MediaViewTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.names = {
+            'blob': 'posts/ab/' + 'ab' * 32 + '.gif',
+            'legacy': 'posts/small.gif',
+        }
+        for name in self.names.values():
+            os.makedirs(os.path.dirname(f'{self.directory}/{name}'),
+                        exist_ok=True)
+            with open(f'{self.directory}/{name}', 'wb') as file:
+                file.write(b'GIF89a')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_content_addressed_media_immutable(self):
+        """Файлы с именем из хэша кэшируются навсегда, остальные - нет"""
+        factory = RequestFactory()
+        with override_settings(MEDIA_ROOT=self.directory):
+            blob = media(factory.get('/'), self.names['blob'])
+            legacy = media(factory.get('/'), self.names['legacy'])
+        self.assertEqual(blob['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+        self.assertFalse(legacy.has_header('Cache-Control'))
+
+    def test_nginx_config_matches(self):
+        """Правило nginx отмечает те же файлы тем же заголовком"""
+        with open(NGINX_MEDIA_CONF) as file:
+            config = file.read()
+        self.assertIn(f'add_header Cache-Control "{IMMUTABLE_CACHE_CONTROL}"',
+                      config)
+        pattern = re.search(r'location ~ "(.+)"', config).group(1)
+        for name in self.names.values():
+            with self.subTest(name=name):
+                self.assertEqual(
+                    bool(re.search(pattern, f'/media/{name}')),
+                    bool(IMMUTABLE_MEDIA.search(name)))
@@ -1,4 +1,13 @@
+import re
+
+from django.conf import settings
 from django.shortcuts import render
+from django.views.static import serve
+
+# Имя из хэша содержимого (posts.storage, миниатюры sorl) не достаётся
+# другому файлу - такие файлы можно кэшировать навсегда
+IMMUTABLE_MEDIA = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{32,}\.\w+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
 
 
 def page_not_found(request, exception):
@@ -11,3 +20,12 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'core/500.html')
+
+
+def media(request, path):
+    """Медиафайлы для разработки (только при DEBUG); в бою их и тот же
+    заголовок отдаёт nginx - deploy/nginx/yatube-media.conf."""
+    response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    if IMMUTABLE_MEDIA.search(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
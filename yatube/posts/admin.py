@@ -1,18 +1,149 @@
+import datetime as dt
+
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.db import models
+from django.db.models import Max, Min
+from django.utils import timezone
 
 # Register your models here.
+from . import search
+from .forms import PostForm
 from .models import Post, Group, Comment, Follow
+from .utils import EstimatedCountPaginator
+
+
+class DateBoundsQuerySet(models.QuerySet):
+    """Строки для date_hierarchy: годы и месяцы берутся из границ дат,
+    а не из DISTINCT по усечённой дате каждой строки.
+
+    SQLite находит MIN или MAX одним шагом по индексу, только если такой
+    агрегат в запросе один, поэтому границы читаются двумя запросами.
+    """
+
+    def aggregate(self, *args, **kwargs):
+        if args or len(kwargs) < 2 or not all(
+                isinstance(value, (Min, Max)) for value in kwargs.values()):
+            return super().aggregate(*args, **kwargs)
+        result = {}
+        for name, value in kwargs.items():
+            result.update(super().aggregate(**{name: value}))
+        return result
+
+    def dates(self, field_name, kind, order='ASC'):
+        if kind not in ('year', 'month'):
+            return super().dates(field_name, kind, order)
+        bounds = self.aggregate(first=Min(field_name), last=Max(field_name))
+        if bounds['first'] is None:
+            return []
+        first, last = (timezone.localtime(bounds[name]).date()
+                       for name in ('first', 'last'))
+        if kind == 'year':
+            dates = [dt.date(year, 1, 1)
+                     for year in range(first.year, last.year + 1)]
+        else:
+            dates = [dt.date(month // 12, month % 12 + 1, 1)
+                     for month in range(first.year * 12 + first.month - 1,
+                                        last.year * 12 + last.month)]
+        return dates if order == 'ASC' else dates[::-1]
+
+
+class FastAdmin(admin.ModelAdmin):
+    """Список без COUNT(*): число строк оценивается, общее число
+    записей без фильтров не считается; годы и месяцы date_hierarchy -
+    по границам дат."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = DateBoundsQuerySet(self.model)
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset
+
+
+class LoadedAutocompleteSelect(AutocompleteSelect):
+    """Autocomplete, которому выбранный объект передаётся готовым
+    (selected): без отдельного запроса на каждую строку списка."""
+    selected = None
 
+    def optgroups(self, name, value, attr=None):
+        selected = self.selected
+        if selected is None or {str(v) for v in value} != {str(selected.pk)}:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        label = self.choices.field.label_from_instance(selected)
+        options.append(self.create_option(
+            name, selected.pk, label, True, len(options)))
+        return [(None, options, 0)]
 
-class PostAdmin(admin.ModelAdmin):
+
+class PostChangeListForm(forms.ModelForm):
+    """Строка списка записей: группа уже выбрана list_select_related."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        field = self.fields.get('group')
+        if field is not None and self.instance.group_id is not None:
+            field.widget.widget.selected = self.instance.group
+
+
+@admin.register(Group)
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug', 'posts_count')
+    search_fields = ('title', 'slug')
+
+
+@admin.register(Post)
+class PostAdmin(FastAdmin):
+    # Картинка проверяется и описывается так же, как на сайте
+    form = PostForm
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    # Год, месяц и день фильтруются диапазоном по post_date_idx, списки
+    # лет и месяцев - по границам дат (DateBoundsQuerySet)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
     list_editable = ('group',)
+    # Вместо <select> со всеми группами и пользователями в каждой строке
+    autocomplete_fields = ('group',)
+    raw_id_fields = ('author',)
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'group':
+            kwargs['widget'] = LoadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', PostChangeListForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по FTS5-индексу вместо LIKE '%...%' по всей таблице
+        if not search.to_match(search_term):
+            return queryset, False
+        return queryset.filter(
+            id__in=search.matching_ids(search_term)), False
+
+
+@admin.register(Comment)
+class CommentAdmin(FastAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post_id')
+    list_select_related = ('author',)
+    date_hierarchy = 'created'
+    raw_id_fields = ('post', 'author')
 
 
-admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
-admin.site.register(Comment)
-admin.site.register(Follow)
+@admin.register(Follow)
+class FollowAdmin(FastAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
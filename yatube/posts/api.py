@@ -0,0 +1,166 @@
+"""JSON API лент и записи только для чтения.
+
+Страницы листаются курсором (CursorPaginator), строки берутся из
+values() - без моделей - и сериализуются потоком. ?fields=id,text
+оставляет в ответе только нужные поля.
+
+ETag ответа - поколение области (posts.generations) и адрес запроса,
+Last-Modified - время последнего изменения области: оба берутся из
+кэша, поэтому повторный запрос неизменившейся страницы получает 304,
+не обращаясь к таблице записей.
+"""
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from core.decorators import query_budget
+
+from . import generations
+from .models import Comment, Group, Post, User
+from .settings import POST_COUNT
+from .utils import CursorPaginator
+
+# Поле ответа -> поле values()
+FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+    'duplicate_of': 'duplicate_of',
+}
+# Поля лент: ETag ленты меняют только записи, а не комментарии, поэтому
+# число комментариев и сами комментарии - только у записи
+FEED_FIELDS = tuple(field for field in FIELDS if field != 'comments_count')
+DETAIL_FIELDS = (*FIELDS, 'comments')
+KEY_FIELDS = ('pub_date', 'id')
+IMAGE_STORAGE = Post._meta.get_field('image').storage
+
+
+def error(message, status=400):
+    return JsonResponse({'error': message}, status=status,
+                        json_dumps_params={'ensure_ascii': False})
+
+
+def requested_fields(request, allowed=FEED_FIELDS):
+    """Поля из ?fields= по порядку или все; None - есть неизвестные."""
+    names = [name for name in request.GET.get('fields', '').split(',')
+             if name]
+    if not names:
+        return list(allowed)
+    if any(name not in allowed for name in names):
+        return None
+    return list(dict.fromkeys(names))
+
+
+def serialize(row, fields):
+    data = {field: row[FIELDS[field]] for field in fields
+            if field in FIELDS}
+    if data.get('image') is not None:
+        data['image'] = (IMAGE_STORAGE.url(data['image'])
+                         if data['image'] else None)
+    return data
+
+
+def dumps(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def conditional(request, scope, respond):
+    """Ответ respond() с ETag и Last-Modified области scope или 304,
+    если у клиента та же версия."""
+    digest = hashlib.md5(request.get_full_path().encode()).hexdigest()[:12]
+    etag = quote_etag(f'{generations.get(scope)}-{digest}')
+    last_modified = generations.modified(scope)
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=last_modified)
+    if response is None:
+        response = respond()
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Кэшировать можно, но каждый раз сверяясь с сервером
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+def stream_page(page_obj, fields):
+    """Тело страницы по частям: записи по одной, потом курсоры."""
+    yield '{"results": ['
+    for number, row in enumerate(page_obj):
+        yield (', ' if number else '') + dumps(serialize(row, fields))
+    yield '], "next": {}, "previous": {}}}'.format(
+        dumps(page_obj.next_cursor), dumps(page_obj.previous_cursor))
+
+
+def feed_response(request, scope, queryset):
+    fields = requested_fields(request)
+    if fields is None:
+        return error(f'Допустимые поля: {", ".join(FEED_FIELDS)}')
+
+    def respond():
+        lookups = {*KEY_FIELDS, *(FIELDS[field] for field in fields)}
+        page_obj = CursorPaginator(
+            queryset.values(*lookups), POST_COUNT, key_fields=KEY_FIELDS,
+        ).get_page(request.GET.get('cursor'))
+        # Строки страницы уже выбраны: поток только сериализует их
+        return StreamingHttpResponse(stream_page(page_obj, fields),
+                                     content_type='application/json')
+    return conditional(request, scope, respond)
+
+
+@query_budget(1)
+def index(request):
+    return feed_response(request, 'all', Post.objects.all())
+
+
+@query_budget(2)
+def group_posts(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'id', flat=True).first()
+    if group_id is None:
+        return error('Группа не найдена', status=404)
+    return feed_response(request, f'group:{group_id}',
+                         Post.objects.filter(group_id=group_id))
+
+
+@query_budget(2)
+def profile(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'id', flat=True).first()
+    if author_id is None:
+        return error('Пользователь не найден', status=404)
+    return feed_response(request, f'author:{author_id}',
+                         Post.objects.filter(author_id=author_id))
+
+
+@query_budget(2)
+def post_detail(request, post_id):
+    fields = requested_fields(request, DETAIL_FIELDS)
+    if fields is None:
+        return error(f'Допустимые поля: {", ".join(DETAIL_FIELDS)}')
+
+    def respond():
+        row = Post.objects.filter(id=post_id).values(
+            'id', *(FIELDS[field] for field in fields if field in FIELDS)
+        ).first()
+        if row is None:
+            return error('Запись не найдена', status=404)
+        data = serialize(row, fields)
+        if 'comments' in fields:
+            data['comments'] = [
+                {'id': comment_id, 'author': author, 'text': text,
+                 'created': created}
+                for comment_id, author, text, created in
+                Comment.objects.filter(post_id=post_id).values_list(
+                    'id', 'author__username', 'text', 'created')
+            ]
+        return JsonResponse(data, encoder=DjangoJSONEncoder,
+                            json_dumps_params={'ensure_ascii': False})
+    return conditional(request, f'post:{post_id}', respond)
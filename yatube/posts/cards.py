@@ -0,0 +1,53 @@
+import hashlib
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import tags, thumbnails
+from .settings import CARD_TIMEOUT
+
+CARD_KEY = 'post_card:{}:{}:{}'
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+# Варианты карточки: в группе не показываем группу, в профиле - автора
+VARIANTS = ('feed', 'group', 'profile')
+
+
+def card_version(post):
+    """Хэш всего, что показывает карточка: правка записи меняет ключ."""
+    group = post.group
+    parts = [post.text, post.image.name or '', post.author.username,
+             str(post.duplicate_of_id or '')]
+    if group is not None:
+        parts += [group.slug, group.title, group.description]
+    return hashlib.md5('\0'.join(parts).encode()).hexdigest()[:12]
+
+
+def card_key(post, variant):
+    return CARD_KEY.format(variant, post.id, card_version(post))
+
+
+def render_cards(posts, variant='feed'):
+    """HTML карточек в порядке posts: одно get_many, рендер только промахов."""
+    keys = [card_key(post, variant) for post in posts]
+    cards = cache.get_many(keys)
+    misses = [(key, post) for key, post in zip(keys, posts)
+              if key not in cards]
+    # Миниатюры всех промахов - одним обращением к хранилищу sorl
+    pictures = thumbnails.pictures([post.image for _, post in misses])
+    # Упоминания существующих пользователей - тоже одним запросом
+    mentions = tags.mentioned([post for _, post in misses])
+    fresh = {}
+    for key, post in misses:
+        picture = pictures.get(post.image.name)
+        cards[key] = render_to_string(CARD_TEMPLATE, {
+            'post': post, 'variant': variant, 'picture': picture,
+            'mentions': mentions.get(post.id, ())})
+        if post.image and picture is None:
+            # Карточку с заглушкой не кэшируем
+            thumbnails.schedule(post)
+        else:
+            fresh[key] = cards[key]
+    if fresh:
+        cache.set_many(fresh, CARD_TIMEOUT)
+    return [mark_safe(cards[key]) for key in keys]
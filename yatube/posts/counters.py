@@ -0,0 +1,107 @@
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def recount_user(user_id):
+    """Пересчитывает счётчики пользователя по исходным таблицам."""
+    stats, _ = UserStats.objects.update_or_create(user_id=user_id, defaults={
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    })
+    return stats
+
+
+def user_stats(user):
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return recount_user(user.id)
+
+
+def change_user(user_id, field, delta):
+    updated = _change(UserStats.objects.filter(user_id=user_id),
+                      field, delta)
+    if not updated and delta > 0:
+        recount_user(user_id)
+
+
+def change_group(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_comments(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def add_last_post(post):
+    """Новая запись становится последней в своей группе."""
+    if post.group_id is None:
+        return
+    Group.objects.filter(
+        Q(last_post_date__isnull=True) | Q(last_post_date__lte=post.pub_date),
+        pk=post.group_id,
+    ).update(last_post_date=post.pub_date, last_post_author=post.author_id)
+
+
+def refresh_last_post(group_id):
+    """Ищет последнюю запись группы заново (по post_group_date_idx)."""
+    if group_id is None:
+        return
+    last = Post.objects.filter(group_id=group_id).order_by(
+        '-pub_date', '-id').values('pub_date', 'author_id').first() or {}
+    Group.objects.filter(pk=group_id).update(
+        last_post_date=last.get('pub_date'),
+        last_post_author=last.get('author_id'))
+
+
+def move_post(post, old_group_id):
+    """Переносит запись в счётчиках групп после смены группы."""
+    if post.group_id != old_group_id:
+        change_group(old_group_id, -1)
+        change_group(post.group_id, 1)
+        refresh_last_post(old_group_id)
+        add_last_post(post)
+
+
+def _last_post(field):
+    return Subquery(Post.objects.filter(group=OuterRef('pk')).order_by(
+        '-pub_date', '-id').values(field)[:1])
+
+
+def _count(queryset, field):
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')}).order_by().values(
+            field).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def reconcile():
+    """Пересчитывает все счётчики несколькими UPDATE ... SELECT."""
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id) for user_id in User.objects.filter(
+            stats__isnull=True).values_list('pk', flat=True).iterator()),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    UserStats.objects.update(
+        posts_count=_count(Post.objects.all(), 'author'),
+        followers_count=_count(Follow.objects.all(), 'author'),
+        following_count=_count(Follow.objects.all(), 'user'),
+    )
+    Group.objects.update(
+        posts_count=_count(Post.objects.all(), 'group'),
+        last_post_date=_last_post('pub_date'),
+        last_post_author=_last_post('author'),
+    )
+    Post.objects.update(
+        comments_count=_count(Comment.objects.all(), 'post'))
@@ -0,0 +1,220 @@
+"""Похожие записи: MinHash текста и LSH-индекс полос (PostBand).
+
+Сигнатура - минимумы MINHASH_PERMUTATIONS хэш-функций по шинглам из
+SHINGLE_SIZE слов: доля совпавших минимумов двух сигнатур оценивает
+долю общих шинглов текстов. Сигнатура режется на MINHASH_BANDS полос;
+похожие тексты почти наверняка совпадают хотя бы в одной, поэтому новую
+запись сравнивают только с записями, у которых есть такая же полоса, -
+один запрос по post_band_key_idx. В индексе лежат полосы только
+оригиналов: волна спама не раздувает корзины.
+
+Сигнатура считается перед INSERT новой записи (sign), оригинал ищется
+сразу после него (index_post). Правка текста сбрасывает сигнатуру, и
+запись заново подписывает команда find_duplicates, которая заодно
+целиком пересчитывает кластеры повторов по всем сигнатурам (cluster) и
+пересобирает индекс.
+"""
+import re
+import zlib
+
+import numpy as np
+from django.db import transaction
+
+from . import generations
+from .models import Post, PostBand
+from .settings import (DUPLICATE_MIN_WORDS, DUPLICATE_THRESHOLD,
+                       MINHASH_BANDS, MINHASH_PERMUTATIONS, SHINGLE_SIZE)
+
+BATCH_SIZE = 500
+WORD = re.compile(r'\w+')
+# Хэш-функции (a * x + b) mod PRIME; x - crc32 шингла, меньше 2 ** 32,
+# так что произведение помещается в uint64
+PRIME = (1 << 31) - 1
+_random = np.random.default_rng(20211)
+MULTIPLIERS = _random.integers(1, PRIME, MINHASH_PERMUTATIONS,
+                               dtype=np.uint64)
+OFFSETS = _random.integers(0, PRIME, MINHASH_PERMUTATIONS, dtype=np.uint64)
+# Полоса хэшируется в 64 бита скалярным произведением с нечётными
+# множителями (по модулю 2 ** 64); номер полосы входит в хэш
+ROWS = MINHASH_PERMUTATIONS // MINHASH_BANDS
+BAND_MULTIPLIERS = _random.integers(
+    0, 1 << 63, ROWS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+BAND_SALTS = _random.integers(0, 1 << 63, MINHASH_BANDS, dtype=np.uint64)
+
+
+def shingles(text):
+    """crc32 шинглов текста или None, если слов меньше
+    DUPLICATE_MIN_WORDS."""
+    words = WORD.findall(text.lower())
+    if len(words) < DUPLICATE_MIN_WORDS:
+        return None
+    return np.unique(np.array([
+        zlib.crc32(' '.join(words[start:start + SHINGLE_SIZE]).encode())
+        for start in range(len(words) - SHINGLE_SIZE + 1)
+    ], dtype=np.uint64))
+
+
+def signature(text):
+    """MinHash текста (uint32, MINHASH_PERMUTATIONS значений) или None
+    для короткого текста."""
+    hashed = shingles(text)
+    if hashed is None:
+        return None
+    values = (MULTIPLIERS[:, np.newaxis] * hashed + OFFSETS[:, np.newaxis]
+              ) % np.uint64(PRIME)
+    return values.min(axis=1).astype(np.uint32)
+
+
+def band_keys(signatures):
+    """Ключи полос (n, MINHASH_BANDS) для сигнатур (n,
+    MINHASH_PERMUTATIONS) - int64, как в BigIntegerField."""
+    rows = signatures.reshape(len(signatures), MINHASH_BANDS, ROWS)
+    keys = (rows.astype(np.uint64) * BAND_MULTIPLIERS).sum(
+        axis=2, dtype=np.uint64) ^ BAND_SALTS
+    return keys.view(np.int64)
+
+
+def _unpack(stored):
+    return np.frombuffer(stored, dtype=np.uint32)
+
+
+def sign(text):
+    """Сигнатура для колонки Post.signature: пустая у короткого текста."""
+    current = signature(text)
+    return b'' if current is None else current.tobytes()
+
+
+def index_post(post):
+    """Ищет оригинал новой записи среди записей с общей полосой: повтор
+    помечается duplicate_of, оригинал попадает в индекс. Возвращает id
+    оригинала или None."""
+    if not post.signature:
+        return None
+    current = _unpack(post.signature)
+    keys = band_keys(current[np.newaxis])[0].tolist()
+    candidates = {
+        post_id: (stored, original_id)
+        for post_id, stored, original_id in PostBand.objects.filter(
+            key__in=keys
+        ).exclude(post_id=post.id).values_list(
+            'post_id', 'post__signature', 'post__duplicate_of')
+        if stored
+    }
+    original, best = None, DUPLICATE_THRESHOLD
+    for post_id, (stored, original_id) in sorted(candidates.items()):
+        similarity = np.mean(_unpack(stored) == current)
+        if similarity >= best:
+            original, best = original_id or post_id, similarity
+    if original is None:
+        PostBand.objects.bulk_create(
+            PostBand(key=key, post_id=post.id) for key in keys)
+    else:
+        post.duplicate_of_id = original
+        Post.objects.filter(id=post.id).update(duplicate_of=original)
+    return original
+
+
+def sign_missing(chunk_size=BATCH_SIZE):
+    """Подписывает записи без сигнатуры (старые и правленые), порциями
+    по id; короткий текст получает пустую сигнатуру. Возвращает число
+    записей."""
+    last_id = signed = 0
+    while True:
+        posts = list(Post.objects.filter(
+            id__gt=last_id, signature__isnull=True
+        ).order_by('id').only('id', 'text')[:chunk_size])
+        if not posts:
+            return signed
+        for post in posts:
+            post.signature = sign(post.text)
+        Post.objects.bulk_update(posts, ['signature'],
+                                 batch_size=BATCH_SIZE)
+        signed += len(posts)
+        last_id = posts[-1].id
+
+
+def cluster(signatures):
+    """Номер оригинала для каждой сигнатуры (n, MINHASH_PERMUTATIONS);
+    строки - в порядке публикации.
+
+    В каждой полосе строки с одинаковым ключом связываются с первой
+    строкой корзины, если похожи на неё не меньше DUPLICATE_THRESHOLD;
+    компоненты связности находит проталкивание минимальной метки по
+    рёбрам со сжатием путей. Оригинал компоненты - самая ранняя запись.
+    """
+    count = len(signatures)
+    positions = np.arange(count)
+    keys = band_keys(signatures)
+    sources, targets = [], []
+    for band in range(MINHASH_BANDS):
+        order = np.argsort(keys[:, band], kind='stable')
+        ordered = keys[order, band]
+        starts = np.ones(count, dtype=bool)
+        starts[1:] = ordered[1:] != ordered[:-1]
+        first = order[np.maximum.accumulate(np.where(starts, positions, 0))]
+        members = ~starts
+        pair = order[members], first[members]
+        similar = np.mean(
+            signatures[pair[0]] == signatures[pair[1]], axis=1
+        ) >= DUPLICATE_THRESHOLD
+        sources.append(pair[0][similar])
+        targets.append(pair[1][similar])
+    sources, targets = np.concatenate(sources), np.concatenate(targets)
+    labels = positions.copy()
+    while True:
+        updated = labels.copy()
+        np.minimum.at(updated, sources, labels[targets])
+        np.minimum.at(updated, targets, labels[sources])
+        updated = updated[updated]
+        if np.array_equal(updated, labels):
+            return labels
+        labels = updated
+
+
+def rebuild(chunk_size=BATCH_SIZE):
+    """Подписывает записи без сигнатуры, заново размечает повторы по всем
+    сигнатурам и пересобирает индекс полос. Возвращает (подписано,
+    повторов, изменено)."""
+    signed = sign_missing(chunk_size)
+    rows = Post.objects.exclude(signature=b'').filter(
+        signature__isnull=False
+    ).order_by('id').values_list(
+        'id', 'signature', 'duplicate_of', 'author', 'group')
+    ids, stored, current, scopes = [], [], [], {}
+    for post_id, packed, original_id, author_id, group_id in rows.iterator(
+            chunk_size=chunk_size):
+        ids.append(post_id)
+        stored.append(packed)
+        current.append(original_id)
+        scopes[post_id] = author_id, group_id
+    if not ids:
+        PostBand.objects.all().delete()
+        return signed, 0, 0
+    ids = np.array(ids, dtype=np.int64)
+    signatures = _unpack(b''.join(stored)).reshape(len(ids), -1)
+    labels = cluster(signatures)
+    originals = np.where(labels != np.arange(len(ids)), ids[labels], 0)
+    changed = [
+        (int(post_id), int(original) or None)
+        for post_id, original, old in zip(ids, originals, current)
+        if (int(original) or None) != old
+    ]
+    keep = labels == np.arange(len(ids))
+    keys = band_keys(signatures[keep])
+    with transaction.atomic():
+        Post.objects.bulk_update(
+            [Post(id=post_id, duplicate_of_id=original)
+             for post_id, original in changed],
+            ['duplicate_of'], batch_size=BATCH_SIZE)
+        PostBand.objects.all().delete()
+        PostBand.objects.bulk_create(
+            (PostBand(key=int(key), post_id=int(post_id))
+             for post_id, row in zip(ids[keep], keys) for key in row),
+            batch_size=BATCH_SIZE)
+    bumped = {scope for post_id, _ in changed
+              for scope in generations.post_scopes(Post(
+                  id=post_id, author_id=scopes[post_id][0],
+                  group_id=scopes[post_id][1]))}
+    if bumped:
+        generations.bump(*bumped)
+    return signed, int((~keep).sum()), len(changed)
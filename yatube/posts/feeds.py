@@ -0,0 +1,169 @@
+import heapq
+from itertools import islice
+
+from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import FEED_FIELDS, FeedEntry, Follow, Post
+from .settings import COUNT_TIMEOUT, RECENT_POSTS_LIMIT, RECENT_POSTS_TIMEOUT
+from .utils import count_key
+
+BATCH_SIZE = 500
+RECENT_POSTS_KEY = 'recent_posts:{}'
+
+
+def _bulk_insert(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def forget_counts(user_ids):
+    """Сбрасывает закэшированное число записей в лентах пользователей."""
+    cache.delete_many([count_key('follow', user_id) for user_id in user_ids])
+
+
+def fan_out(post):
+    """Кладёт новую запись в ленты всех подписчиков автора."""
+    user_ids = list(Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True))
+    _bulk_insert(
+        FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in user_ids
+    )
+    forget_counts(user_ids)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика все записи автора."""
+    _bulk_insert(
+        FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in Post.objects.filter(
+            author_id=author_id
+        ).values_list('id', 'pub_date').iterator()
+    )
+    forget_counts([user_id])
+
+
+def remove(user_id, author_id):
+    """Убирает записи автора из ленты бывшего подписчика."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+    forget_counts([user_id])
+
+
+def rebuild(user_ids=None):
+    """Собирает ленты заново по таблице подписок."""
+    entries = FeedEntry.objects.all()
+    follows = Follow.objects.all()
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+        follows = follows.filter(user_id__in=user_ids)
+    forget_counts(entries.order_by().values_list(
+        'user_id', flat=True).distinct())
+    entries.delete()
+    for user_id, author_id in follows.values_list(
+            'user_id', 'author_id').iterator():
+        backfill(user_id, author_id)
+
+
+def invalidate_recent_posts(author_id):
+    cache.delete(RECENT_POSTS_KEY.format(author_id))
+
+
+def _load_recent_posts(author_ids):
+    """Последние RECENT_POSTS_LIMIT записей каждого автора - один запрос
+    на BATCH_SIZE авторов: номер записи внутри автора считает оконная
+    функция, лишние отсекает внешний WHERE."""
+    lists = {author_id: [] for author_id in author_ids}
+    author_ids = list(author_ids)
+    for start in range(0, len(author_ids), BATCH_SIZE):
+        ranked = Post.objects.filter(
+            author_id__in=author_ids[start:start + BATCH_SIZE]
+        ).annotate(position=Window(
+            RowNumber(), partition_by=[F('author_id')],
+            order_by=[F('pub_date').desc(), F('id').desc()],
+        )).order_by().values_list(
+            'id', 'author_id', 'pub_date', 'position')
+        sql, params = ranked.query.sql_with_params()
+        for post in Post.objects.raw(
+                f'SELECT id, author_id, pub_date FROM ({sql}) ranked '
+                f'WHERE ranked.position <= %s ORDER BY author_id, '
+                f'pub_date DESC, id DESC',
+                (*params, RECENT_POSTS_LIMIT)):
+            lists[post.author_id].append(
+                (post.pub_date.timestamp(), post.id))
+    return lists
+
+
+def recent_posts(author_ids):
+    """Последние записи авторов: {author_id: [(timestamp, post_id)]}.
+
+    Списки ограничены RECENT_POSTS_LIMIT и отсортированы от новых к
+    старым; недостающие в кэше собираются одним запросом и кэшируются.
+    """
+    keys = {RECENT_POSTS_KEY.format(author_id): author_id
+            for author_id in author_ids}
+    found = cache.get_many(keys)
+    lists = {keys[key]: value for key, value in found.items()}
+    missing = _load_recent_posts(
+        [author_id for key, author_id in keys.items() if key not in found])
+    if missing:
+        lists.update(missing)
+        cache.set_many({RECENT_POSTS_KEY.format(author_id): posts
+                        for author_id, posts in missing.items()},
+                       RECENT_POSTS_TIMEOUT)
+    return lists
+
+
+def merged_post_ids(author_ids, limit):
+    """Первые limit записей ленты: k-way слияние списков авторов."""
+    return [post_id for _, post_id in islice(
+        heapq.merge(*recent_posts(author_ids).values(), reverse=True),
+        limit)]
+
+
+class FollowFeed:
+    """Лента подписок как последовательность записей для Paginator.
+
+    Страницы в пределах RECENT_POSTS_LIMIT собираются слиянием
+    списков последних записей авторов из кэша, без запроса к ленте.
+    Более глубокие страницы читаются из FeedEntry. Число записей
+    кэшируется и сбрасывается при каждом изменении ленты.
+    """
+
+    def __init__(self, user):
+        self.user = user
+        self.entries = FeedEntry.objects.filter(user=user).select_related(
+            'post__author', 'post__group'
+        ).only(
+            'pub_date', 'post', *(f'post__{field}' for field in FEED_FIELDS)
+        ).order_by('-pub_date', '-post_id')
+
+    def count(self):
+        key = count_key('follow', self.user.id)
+        count = cache.get(key)
+        if count is None:
+            count = self.entries.count()
+            cache.set(key, count, COUNT_TIMEOUT)
+        return count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item):
+        if item.stop > RECENT_POSTS_LIMIT:
+            return [entry.post for entry in self.entries[item]]
+        post_ids = merged_post_ids(
+            Follow.objects.filter(
+                user=self.user).values_list('author_id', flat=True),
+            item.stop)[item]
+        posts = Post.objects.for_feed().in_bulk(post_ids)
+        return [posts[post_id] for post_id in post_ids
+                if post_id in posts]
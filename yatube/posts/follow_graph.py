@@ -0,0 +1,117 @@
+"""Снимок графа подписок в массивах NumPy и подбор «кого почитать».
+
+Граф хранится в формате CSR: для каждого пользователя (плотный номер
+0..n-1) его подписки - срез indices[indptr[i]:indptr[i + 1]]; второй
+такой же снимок по транспонированному графу даёт подписчиков. Кандидаты
+одного пользователя считаются операциями над срезами его окрестности,
+без SQL и без массивов размером во весь граф.
+"""
+from itertools import chain
+
+import numpy as np
+
+from .models import Follow, User
+from .settings import (SUGGESTIONS_COUNT, SUGGESTIONS_MAX_COFOLLOWERS,
+                       SUGGESTIONS_READERS_PER_AUTHOR)
+
+CHUNK_SIZE = 500
+
+
+class FollowGraph:
+
+    def __init__(self, edges):
+        """edges - массив (m, 2) пар (user_id, author_id)."""
+        self.ids, dense = np.unique(edges, return_inverse=True)
+        dense = dense.reshape(-1, 2)
+        size = len(self.ids)
+        self.out_ptr, self.out_idx = self._csr(dense[:, 0], dense[:, 1],
+                                               size)
+        self.in_ptr, self.in_idx = self._csr(dense[:, 1], dense[:, 0],
+                                             size)
+
+    @classmethod
+    def from_db(cls):
+        pairs = Follow.objects.order_by().values_list(
+            'user_id', 'author_id').iterator(chunk_size=10000)
+        edges = np.fromiter(chain.from_iterable(pairs), dtype=np.int64)
+        return cls(edges.reshape(-1, 2))
+
+    @staticmethod
+    def _csr(rows, columns, size):
+        order = np.lexsort((columns, rows))
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=size), out=indptr[1:])
+        return indptr, columns[order]
+
+    @staticmethod
+    def _gather(indptr, indices, nodes, limit=None):
+        """Соседи всех nodes одним массивом и номер узла для каждого;
+        limit - не больше стольких соседей у одного узла."""
+        starts = indptr[nodes]
+        lengths = indptr[nodes + 1] - starts
+        if limit is not None:
+            lengths = np.minimum(lengths, limit)
+        owners = np.repeat(np.arange(len(nodes)), lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(
+            np.cumsum(lengths) - lengths, lengths)
+        return indices[starts[owners] + offsets], owners
+
+    def popular(self, count=SUGGESTIONS_COUNT):
+        """Авторы с наибольшим числом подписчиков (для тех, у кого
+        подписок нет)."""
+        followers = np.diff(self.in_ptr)
+        top = np.lexsort((self.ids, -followers))[:count]
+        return self.ids[top[followers[top] > 0]].tolist()
+
+    def suggest(self, node, count=SUGGESTIONS_COUNT):
+        """id авторов для пользователя с плотным номером node.
+
+        Складываются два нормированных счёта: сколько авторов из
+        подписок пользователя читают кандидата (друзья друзей) и
+        насколько похожи на пользователя читатели кандидата - по числу
+        общих авторов у SUGGESTIONS_MAX_COFOLLOWERS самых похожих.
+        """
+        following = self.out_idx[self.out_ptr[node]:self.out_ptr[node + 1]]
+        if not len(following):
+            return []
+        friends, _ = self._gather(self.out_ptr, self.out_idx, following)
+        # У популярного автора читателей много: хватит части
+        readers, _ = self._gather(self.in_ptr, self.in_idx, following,
+                                  SUGGESTIONS_READERS_PER_AUTHOR)
+        readers, overlap = np.unique(readers, return_counts=True)
+        similar = readers != node
+        readers, overlap = readers[similar], overlap[similar]
+        if len(readers) > SUGGESTIONS_MAX_COFOLLOWERS:
+            top = np.argpartition(
+                -overlap, SUGGESTIONS_MAX_COFOLLOWERS)[
+                :SUGGESTIONS_MAX_COFOLLOWERS]
+            readers, overlap = readers[top], overlap[top]
+        cofollowed, owners = self._gather(self.out_ptr, self.out_idx,
+                                          readers)
+        candidates = np.concatenate((friends, cofollowed))
+        weights = np.concatenate((
+            np.full(len(friends), 1.0 / max(len(following), 1)),
+            overlap[owners] / max(overlap.sum(), 1)))
+        candidates, inverse = np.unique(candidates, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights)
+        allowed = ~np.isin(candidates, following) & (candidates != node)
+        candidates, scores = candidates[allowed], scores[allowed]
+        top = np.lexsort((candidates, -scores))[:count]
+        return self.ids[candidates[top]].tolist()
+
+    def suggest_all(self, count=SUGGESTIONS_COUNT):
+        """{user_id: [author_id]} для всех, у кого есть подписки."""
+        readers = np.flatnonzero(np.diff(self.out_ptr))
+        return {int(self.ids[node]): self.suggest(node, count)
+                for node in readers}
+
+
+def usernames(user_ids):
+    """{id: username} порциями по CHUNK_SIZE."""
+    user_ids = sorted(user_ids)
+    names = {}
+    for start in range(0, len(user_ids), CHUNK_SIZE):
+        names.update(User.objects.filter(
+            id__in=user_ids[start:start + CHUNK_SIZE]
+        ).values_list('id', 'username'))
+    return names
@@ -1,6 +1,9 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import images, tags
 from .models import Post, Comment
+from .validators import validate_image_upload
 
 
 class PostForm(forms.ModelForm):
@@ -8,6 +11,42 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image')
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        upload = self.files.get(self.add_prefix('image'))
+        rejected = getattr(upload, 'rejected', None)
+        if rejected:
+            # BoundedImageUploadHandler оставил вместо файла пустой -
+            # объясняем почему
+            self.fields['image'].error_messages['empty'] = rejected
+
+    def clean_image(self):
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            validate_image_upload(image)
+            image = images.normalize(image)
+            description = images.describe(image)
+        elif not image:
+            description = images.EMPTY_DESCRIPTION
+        else:
+            return image
+        for field, value in description.items():
+            setattr(self.instance, field, value)
+        return image
+
+    def save(self, commit=True):
+        if self.instance.pk is not None and 'text' in self.changed_data:
+            # Сигнатуру нового текста посчитает find_duplicates
+            self.instance.signature = None
+        return super().save(commit)
+
+    def _save_m2m(self):
+        # Вызывается после сохранения записи - и из save(), и из
+        # save_m2m() после save(commit=False)
+        super()._save_m2m()
+        if 'text' in self.changed_data:
+            tags.index_post(self.instance, self.initial.get('text', ''))
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,57 @@
+import time
+
+from django.core.cache import cache
+
+GENERATION_KEY = 'generation:{}'
+MODIFIED_KEY = 'modified:{}'
+
+
+def _initial():
+    # Поколение после вытеснения ключа не совпадёт с прежними
+    return int(time.time() * 1000)
+
+
+def get(*scopes):
+    """Метка текущих поколений областей - часть ключа фрагмента."""
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            initial = _initial()
+            found[key] = (initial if cache.add(key, initial, None)
+                          else cache.get(key, initial))
+    return '.'.join(str(found[key]) for key in keys)
+
+
+def modified(*scopes):
+    """Время (unix, секунды) последнего изменения областей; если время
+    области неизвестно, считается, что она изменилась сейчас."""
+    keys = [MODIFIED_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    now = int(time.time())
+    for key in keys:
+        if key not in found:
+            found[key] = now if cache.add(key, now, None) else cache.get(
+                key, now)
+    return max(found.values())
+
+
+def bump(*scopes):
+    """Делает недействительными фрагменты, собранные с этими областями."""
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial(), None)
+    now = int(time.time())
+    cache.set_many({MODIFIED_KEY.format(scope): now for scope in scopes},
+                   None)
+
+
+def post_scopes(post):
+    """Области, которые показывают запись."""
+    scopes = ['all', f'author:{post.author_id}', f'post:{post.id}']
+    if post.group_id is not None:
+        scopes.append(f'group:{post.group_id}')
+    return scopes
@@ -0,0 +1,68 @@
+import base64
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageFilter, ImageOps
+
+from .settings import IMAGE_MAX_WIDTH, PLACEHOLDER_WIDTH
+
+# GIF не трогаем: пересохранение теряет анимацию
+REENCODED_FORMATS = ('JPEG', 'PNG', 'WEBP')
+# Поля Post, которые заполняет describe
+EMPTY_DESCRIPTION = {
+    'image_width': None,
+    'image_height': None,
+    'image_color': '',
+    'image_placeholder': '',
+}
+
+
+def normalize(upload):
+    """Поворачивает картинку по EXIF, убирает метаданные и уменьшает
+    исходник шире IMAGE_MAX_WIDTH; остальные загрузки не меняет."""
+    upload.seek(0)
+    with Image.open(upload) as image:
+        image_format = image.format
+        if image_format not in REENCODED_FORMATS or (
+                not image.getexif() and image.width <= IMAGE_MAX_WIDTH):
+            upload.seek(0)
+            return upload
+        icc_profile = image.info.get('icc_profile')
+        image = ImageOps.exif_transpose(image)
+    if image.width > IMAGE_MAX_WIDTH:
+        image.thumbnail((IMAGE_MAX_WIDTH, image.height), Image.LANCZOS)
+    params = {'format': image_format}
+    if icc_profile:
+        params['icc_profile'] = icc_profile
+    if image_format in ('JPEG', 'WEBP'):
+        params['quality'] = 90
+    buffer = BytesIO()
+    image.save(buffer, **params)
+    return SimpleUploadedFile(upload.name, buffer.getvalue(),
+                              upload.content_type)
+
+
+def describe(file):
+    """Размеры, преобладающий цвет и крошечная размытая копия картинки
+    (data: URI) - всё, что нужно карточке до загрузки миниатюры."""
+    file.seek(0)
+    with Image.open(file) as image:
+        width, height = image.size
+        # JPEG сразу декодируется в уменьшенном масштабе
+        image.draft('RGB', (PLACEHOLDER_WIDTH * 4, PLACEHOLDER_WIDTH * 4))
+        small = image.convert('RGB')
+    file.seek(0)
+    small.thumbnail((PLACEHOLDER_WIDTH * 4, PLACEHOLDER_WIDTH * 4))
+    _, (red, green, blue) = max(
+        small.quantize(colors=4).convert('RGB').getcolors())
+    small.thumbnail((PLACEHOLDER_WIDTH, PLACEHOLDER_WIDTH))
+    buffer = BytesIO()
+    small.filter(ImageFilter.GaussianBlur(1)).save(
+        buffer, 'JPEG', quality=40)
+    return {
+        'image_width': width,
+        'image_height': height,
+        'image_color': f'#{red:02x}{green:02x}{blue:02x}',
+        'image_placeholder': 'data:image/jpeg;base64,'
+                             + base64.b64encode(buffer.getvalue()).decode(),
+    }
@@ -0,0 +1,64 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import images
+from posts.models import Post
+
+BATCH_SIZE = 200
+
+
+def _describe(name):
+    """Выполняется в дочернем процессе: только файл, без базы."""
+    try:
+        with Post._meta.get_field('image').storage.open(name) as file:
+            return name, images.describe(file)
+    except Exception as error:
+        return name, error
+
+
+class Command(BaseCommand):
+    help = ('Заполняет размеры, цвет и заглушку картинок у записей, '
+            'сохранённых до их появления')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=multiprocessing.cpu_count(),
+                            help='число процессов')
+
+    def handle(self, *args, **options):
+        names = list(Post.objects.exclude(image='').filter(
+            image_width__isnull=True).order_by().values_list(
+            'image', flat=True).distinct())
+        done = failed = 0
+        batch = {}
+        # Дочерние процессы не должны унаследовать соединение с базой
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with ProcessPoolExecutor(options['workers'],
+                                 mp_context=context) as pool:
+            for name, description in pool.map(_describe, names,
+                                              chunksize=16):
+                if isinstance(description, Exception):
+                    failed += 1
+                    self.stderr.write(f'{name}: {description}')
+                    continue
+                batch[name] = description
+                if len(batch) >= BATCH_SIZE:
+                    done += self._save(batch)
+                    batch = {}
+        done += self._save(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей обновлено: {done}, файлов с ошибкой: {failed}'))
+
+    def _save(self, batch):
+        posts = list(Post.objects.filter(
+            image__in=list(batch), image_width__isnull=True).only('image'))
+        for post in posts:
+            for field, value in batch[post.image.name].items():
+                setattr(post, field, value)
+        Post.objects.bulk_update(posts, list(images.EMPTY_DESCRIPTION),
+                                 batch_size=BATCH_SIZE)
+        return len(posts)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+from posts.follow_graph import FollowGraph, usernames
+
+
+class Command(BaseCommand):
+    help = ('Строит снимок графа подписок и кладёт в кэш списки «кого '
+            'почитать»; запускается периодически (cron)')
+
+    def handle(self, *args, **options):
+        graph = FollowGraph.from_db()
+        suggested = graph.suggest_all()
+        popular = graph.popular()
+        names = usernames(set(popular).union(*suggested.values()))
+        suggestions.store(suggested, popular, names)
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей в графе: {len(graph.ids)}, '
+            f'списков: {len(suggested)}'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from posts import duplicates
+
+
+class Command(BaseCommand):
+    help = ('Подписывает записи без сигнатуры, заново размечает повторы '
+            'по всем сигнатурам и пересобирает индекс полос; '
+            'запускается периодически (cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='записей за проход при подписи')
+
+    def handle(self, *args, **options):
+        signed, repeated, changed = duplicates.rebuild(
+            options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Подписано записей: {signed}, повторов: {repeated}, '
+            f'изменено отметок: {changed}'))
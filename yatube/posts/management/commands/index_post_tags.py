@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import tags
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Заполняет индекс тегов и упоминаний по текстам всех '
+            'записей, порциями по id')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help='записей за проход')
+
+    def handle(self, *args, **options):
+        last_id = posts = entries = 0
+        while True:
+            rows = list(Post.objects.filter(id__gt=last_id).order_by(
+                'id').values_list('id', 'text', 'pub_date')[
+                :options['chunk_size']])
+            if not rows:
+                break
+            with transaction.atomic():
+                entries += tags.index_posts(rows)
+            posts += len(rows)
+            last_id = rows[-1][0]
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей: {posts}, тегов и упоминаний: {entries}'))
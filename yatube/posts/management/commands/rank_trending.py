@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = ('Убирает из рейтинга записи старше окна и обновляет список '
+            'популярных записей; запускается периодически (cron)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true',
+                            help='посчитать рейтинги заново по комментариям')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['rebuild']:
+                trending.rebuild()
+            else:
+                trending.prune()
+        ranked = trending.rank()
+        self.stdout.write(self.style.SUCCESS(
+            f'Популярных записей: {len(ranked["ids"])}'))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import feeds
+from posts.models import FeedEntry
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок пользователей с нуля'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append',
+                            dest='user_ids',
+                            help='id пользователя (можно несколько)')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            feeds.rebuild(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Записей в лентах: {FeedEntry.objects.count()}'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters, media
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает денормализованные счётчики записей и подписок '
+            'и ссылки на файлы картинок')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            counters.reconcile()
+            media.recount()
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
@@ -0,0 +1,59 @@
+"""Счётчики ссылок на файлы картинок в ContentAddressedStorage.
+
+Одинаковые загрузки хранятся одним файлом, поэтому удалить его можно
+только вместе с последней записью, которая его показывает. Картинки
+с другими именами (загруженные до хранилища по содержимому) не
+считаются и не удаляются: при замене у них сбрасываются только
+миниатюры.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+
+from . import thumbnails
+from .models import ImageBlob, Post
+from .storage import is_blob
+
+
+def retain(name):
+    """Ещё одна запись показывает файл."""
+    if not is_blob(name):
+        return
+    blobs = ImageBlob.objects.filter(name=name)
+    if not blobs.update(references=F('references') + 1):
+        _, created = ImageBlob.objects.get_or_create(
+            name=name, defaults={'references': 1})
+        if not created:
+            blobs.update(references=F('references') + 1)
+
+
+def release(name):
+    """Запись больше не показывает файл; последняя - удаляет его."""
+    if not is_blob(name):
+        thumbnails.invalidate(name)
+        return
+    ImageBlob.objects.filter(name=name).update(
+        references=F('references') - 1)
+    deleted, _ = ImageBlob.objects.filter(name=name, references=0).delete()
+    if deleted:
+        thumbnails.invalidate(name)
+        transaction.on_commit(lambda: _delete_file(name))
+
+
+def _delete_file(name):
+    # Между release и коммитом файл могли загрузить снова
+    if not ImageBlob.objects.filter(name=name).exists():
+        Post._meta.get_field('image').storage.delete(name)
+
+
+def recount():
+    """Пересчитывает ссылки по записям (например, после bulk_create)."""
+    references = {
+        name: count
+        for name, count in Post.objects.exclude(image='').order_by(
+        ).values_list('image').annotate(Count('id'))
+        if is_blob(name)}
+    ImageBlob.objects.exclude(name__in=list(references)).update(
+        references=0)
+    for name, count in references.items():
+        ImageBlob.objects.update_or_create(
+            name=name, defaults={'references': count})
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_comment_created_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Post', verbose_name='запись')),
+                ('pub_date', models.DateTimeField(verbose_name='дата публикации')),
+                ('score', models.FloatField(verbose_name='рейтинг')),
+            ],
+            options={
+                'verbose_name': 'популярная запись',
+                'verbose_name_plural': 'популярные записи',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='trendingpost',
+            index=models.Index(fields=['-score'], name='trending_score_idx'),
+        ),
+    ]
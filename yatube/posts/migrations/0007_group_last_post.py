@@ -0,0 +1,48 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:34
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_last_post(apps, schema_editor):
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+
+    def last(field):
+        return models.Subquery(Post.objects.filter(
+            group=models.OuterRef('pk')).order_by(
+            '-pub_date', '-id').values(field)[:1])
+
+    Group.objects.update(last_post_date=last('pub_date'),
+                         last_post_author=last('author'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0006_trending_post'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='group',
+            options={'ordering': ('title', 'id'), 'verbose_name': 'группа', 'verbose_name_plural': 'группы'},
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='last_post_author',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='автор последней записи'),
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='last_post_date',
+            field=models.DateTimeField(editable=False, null=True, verbose_name='дата последней записи'),
+        ),
+        migrations.AddIndex(
+            model_name='group',
+            index=models.Index(fields=['title', 'id'], name='group_title_idx'),
+        ),
+        migrations.RunPython(fill_last_post, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_group_last_post'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostTag',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('tag', 'тег'), ('mention', 'упоминание')], max_length=7, verbose_name='вид')),
+                ('name', models.CharField(max_length=150, verbose_name='имя')),
+                ('pub_date', models.DateTimeField(verbose_name='дата публикации')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tags', to='posts.Post', verbose_name='запись')),
+            ],
+            options={
+                'verbose_name': 'тег записи',
+                'verbose_name_plural': 'теги записей',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='posttag',
+            index=models.Index(fields=['kind', 'name', '-pub_date', '-post'], name='post_tag_name_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='posttag',
+            constraint=models.UniqueConstraint(fields=('post', 'kind', 'name'), name='unique post tag'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 2.2.6 on 2026-10-18 03:46
+
+from importlib import import_module
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+post_search = import_module('posts.migrations.0004_post_search')
+
+
+def restore_search_triggers(apps, schema_editor):
+    # SQLite меняет posts_post пересозданием таблицы, а с ней пропадают
+    # триггеры FTS5 из 0004
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in post_search.DROP[:-1] + post_search.CREATE[1:]:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_post_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop,
+                             restore_search_triggers),
+        migrations.AddField(
+            model_name='post',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='posts.Post', verbose_name='повтор записи'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='signature',
+            field=models.BinaryField(blank=True, null=True, verbose_name='сигнатура текста'),
+        ),
+        migrations.CreateModel(
+            name='PostBand',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(verbose_name='хэш полосы')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bands', to='posts.Post', verbose_name='запись')),
+            ],
+            options={
+                'verbose_name': 'полоса сигнатуры',
+                'verbose_name_plural': 'полосы сигнатур',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='postband',
+            index=models.Index(fields=['key', 'post'], name='post_band_key_idx'),
+        ),
+        migrations.RunPython(restore_search_triggers,
+                             migrations.RunPython.noop),
+    ]
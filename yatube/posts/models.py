@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
@@ -11,15 +13,56 @@ class Group (models.Model):
                             unique=True,
                             verbose_name='ключ')
     description = models.TextField(verbose_name='описание группы')
+    posts_count = models.PositiveIntegerField(default=0,
+                                              editable=False,
+                                              verbose_name='число записей')
+    # Последняя запись группы для каталога групп (posts.counters)
+    last_post_date = models.DateTimeField(
+        null=True,
+        editable=False,
+        verbose_name='дата последней записи')
+    last_post_author = models.ForeignKey(
+        User,
+        null=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name='+',
+        verbose_name='автор последней записи')
 
     class Meta:
+        ordering = ('title', 'id')
         verbose_name = 'группа'
         verbose_name_plural = 'группы'
+        indexes = [
+            models.Index(fields=['title', 'id'], name='group_title_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
 
+# Колонки, которые нужны карточке записи в лентах
+FEED_FIELDS = (
+    'text', 'pub_date', 'comments_count',
+    'image', 'image_width', 'image_height', 'image_color',
+    'image_placeholder',
+    'author', 'author__username', 'duplicate_of',
+    'group', 'group__title', 'group__slug', 'group__description',
+)
+
+
+class PostQuerySet(models.QuerySet):
+
+    def for_feed(self):
+        """Карточки лент: автор и группа одним запросом, без лишних
+        колонок."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+    def for_detail(self):
+        """Страница записи: автор со счётчиками и группа."""
+        return self.select_related('author__stats', 'group')
+
+
 class Post (models.Model):
     text = models.TextField(verbose_name='текст записи')
     pub_date = models.DateTimeField(auto_now_add=True,
@@ -36,12 +79,54 @@ class Post (models.Model):
                               verbose_name='группа')
     image = models.ImageField(verbose_name='Картинка',
                               upload_to='posts/',
+                              storage=ContentAddressedStorage(),
                               blank=True)
+    # Заполняются при сохранении картинки (images.describe)
+    image_width = models.PositiveIntegerField(null=True,
+                                              editable=False,
+                                              verbose_name='ширина картинки')
+    image_height = models.PositiveIntegerField(null=True,
+                                               editable=False,
+                                               verbose_name='высота картинки')
+    image_color = models.CharField(max_length=7,
+                                   blank=True,
+                                   editable=False,
+                                   verbose_name='цвет картинки')
+    image_placeholder = models.TextField(blank=True,
+                                         editable=False,
+                                         verbose_name='заглушка картинки')
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='число комментариев')
+    # MinHash текста и более ранняя запись, повтором которой эта
+    # является (posts.duplicates)
+    signature = models.BinaryField(null=True,
+                                   blank=True,
+                                   editable=False,
+                                   verbose_name='сигнатура текста')
+    duplicate_of = models.ForeignKey('self',
+                                     blank=True,
+                                     null=True,
+                                     editable=False,
+                                     on_delete=models.SET_NULL,
+                                     related_name='+',
+                                     verbose_name='повтор записи')
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
-        ordering = ('-pub_date',)
+        ordering = ('-pub_date', '-id')
         verbose_name = 'запись'
         verbose_name_plural = 'записи'
+        indexes = [
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_date_idx'),
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_date_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_date_idx'),
+        ]
 
     def __str__(self):
         return (
@@ -52,6 +137,14 @@ class Post (models.Model):
         )
 
 
+class CommentQuerySet(models.QuerySet):
+
+    def for_detail(self):
+        """Комментарии под записью вместе с именами авторов."""
+        return self.select_related('author').only(
+            'post', 'text', 'created', 'author', 'author__username')
+
+
 class Comment (models.Model):
     post = models.ForeignKey(Post,
                              on_delete=models.CASCADE,
@@ -68,10 +161,18 @@ class Comment (models.Model):
                                    )
     text = models.TextField(verbose_name='текст комментария')
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ('-created',)
         verbose_name = 'комментарии'
         verbose_name_plural = 'комментарии'
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='comment_post_created_idx'),
+            models.Index(fields=['-created', '-id'],
+                         name='comment_created_idx'),
+        ]
 
     def __str__(self):
         return (
@@ -100,9 +201,178 @@ class Follow(models.Model):
             models.UniqueConstraint(fields=['user', 'author'],
                                     name='unique subscription')
         ]
+        indexes = [
+            models.Index(fields=['author', 'user'],
+                         name='follow_author_user_idx'),
+        ]
 
     def __str__(self):
         return (
             f'{self.author}, '
             f'{self.user}'
         )
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(User,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='stats',
+                                verbose_name='пользователь'
+                                )
+    posts_count = models.PositiveIntegerField(default=0,
+                                              verbose_name='число записей')
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='число подписчиков')
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='число подписок')
+
+    class Meta:
+        verbose_name = 'счётчики пользователя'
+        verbose_name_plural = 'счётчики пользователей'
+
+    def __str__(self):
+        return (
+            f'{self.user_id}, '
+            f'{self.posts_count}, '
+            f'{self.followers_count}, '
+            f'{self.following_count}'
+        )
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(User,
+                             on_delete=models.CASCADE,
+                             related_name='feed_entries',
+                             verbose_name='подписчик'
+                             )
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='feed_entries',
+                             verbose_name='запись'
+                             )
+    pub_date = models.DateTimeField(verbose_name='дата публикации')
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'лента подписок'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique feed entry')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-post'],
+                         name='feed_entry_user_date_idx')
+        ]
+
+    def __str__(self):
+        return (
+            f'{self.user}, '
+            f'{self.post_id}'
+        )
+
+
+class ImageBlob(models.Model):
+    """Файл в ContentAddressedStorage и число записей, которые его
+    показывают: файл удаляется, когда ссылок не остаётся."""
+    name = models.CharField(max_length=100,
+                            primary_key=True,
+                            verbose_name='имя файла')
+    references = models.PositiveIntegerField(default=0,
+                                             verbose_name='число ссылок')
+
+    class Meta:
+        verbose_name = 'файл картинки'
+        verbose_name_plural = 'файлы картинок'
+
+    def __str__(self):
+        return f'{self.name} ({self.references})'
+
+
+class TrendingPost(models.Model):
+    """Сколько обсуждают запись сейчас (posts.trending).
+
+    score - log2 суммы весов комментариев, где вес растёт вдвое каждые
+    TRENDING_HALF_LIFE секунд: порядок по score - порядок по числу
+    комментариев, затухающему со временем, без пересчёта старых строк.
+    """
+    post = models.OneToOneField(Post,
+                                on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='trending',
+                                verbose_name='запись')
+    pub_date = models.DateTimeField(verbose_name='дата публикации')
+    score = models.FloatField(verbose_name='рейтинг')
+
+    class Meta:
+        verbose_name = 'популярная запись'
+        verbose_name_plural = 'популярные записи'
+        indexes = [
+            models.Index(fields=['-score'], name='trending_score_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}, {self.score:.2f}'
+
+
+class PostTag(models.Model):
+    """Обратный индекс #тегов и @упоминаний из текста записей
+    (posts.tags): записи по тегу или упомянутому пользователю читаются
+    диапазоном индекса, а не LIKE по текстам."""
+    TAG = 'tag'
+    MENTION = 'mention'
+    KINDS = (
+        (TAG, 'тег'),
+        (MENTION, 'упоминание'),
+    )
+
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='tags',
+                             verbose_name='запись')
+    kind = models.CharField(max_length=7,
+                            choices=KINDS,
+                            verbose_name='вид')
+    # Тег - в нижнем регистре, упоминание - имя пользователя
+    name = models.CharField(max_length=150,
+                            verbose_name='имя')
+    pub_date = models.DateTimeField(verbose_name='дата публикации')
+
+    class Meta:
+        verbose_name = 'тег записи'
+        verbose_name_plural = 'теги записей'
+        constraints = [
+            models.UniqueConstraint(fields=['post', 'kind', 'name'],
+                                    name='unique post tag')
+        ]
+        indexes = [
+            models.Index(fields=['kind', 'name', '-pub_date', '-post'],
+                         name='post_tag_name_date_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}, {self.kind}, {self.name}'
+
+
+class PostBand(models.Model):
+    """Полоса LSH сигнатуры записи (posts.duplicates): у похожих
+    записей совпадает хотя бы одна полоса, поэтому кандидатов для новой
+    записи находит поиск её полос по индексу, а не обход всех текстов."""
+    key = models.BigIntegerField(verbose_name='хэш полосы')
+    post = models.ForeignKey(Post,
+                             on_delete=models.CASCADE,
+                             related_name='bands',
+                             verbose_name='запись')
+
+    class Meta:
+        verbose_name = 'полоса сигнатуры'
+        verbose_name_plural = 'полосы сигнатур'
+        indexes = [
+            models.Index(fields=['key', 'post'], name='post_band_key_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post_id}, {self.key}'
@@ -0,0 +1,58 @@
+"""Полнотекстовый поиск по записям: SQLite FTS5.
+
+posts_post_fts - FTS5-таблица с внешним содержимым (content=posts_post):
+хранит только индекс по тексту, а строки берёт из posts_post.
+Триггеры из миграции 0004 обновляют индекс при каждом INSERT, UPDATE
+текста и DELETE записи - в том числе при update() и удалении каскадом,
+которые не отправляют сигналов.
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .settings import SEARCH_MAX_TERMS
+
+FTS_TABLE = 'posts_post_fts'
+TERM = re.compile(r'\w+')
+
+
+def to_match(query):
+    """Запрос пользователя -> выражение MATCH: все слова, как префиксы.
+
+    Каждое слово берётся в кавычки, поэтому операторы FTS5 (OR, NEAR,
+    двоеточия) в запросе не работают и не ломают его.
+    """
+    terms = TERM.findall(query.lower())[:SEARCH_MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def matching_ids(query):
+    """Подзапрос с id записей, подходящих под запрос."""
+    return RawSQL(f'SELECT rowid FROM {FTS_TABLE} '
+                  f'WHERE {FTS_TABLE} MATCH %s', (to_match(query),))
+
+
+def search(query, queryset=None):
+    """Записи по запросу с рангом score: чем больше, тем релевантнее."""
+    if queryset is None:
+        queryset = Post.objects.for_feed()
+    match = to_match(query)
+    if not match:
+        return queryset.none()
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+    ).annotate(score=RawSQL(f'-bm25({FTS_TABLE})', ()))
+
+
+def rebuild():
+    """Пересобирает индекс с нуля по posts_post."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
@@ -1 +1,75 @@
+import os
+
+from django.conf import settings
+
 POST_COUNT = 10
+# Групп на странице каталога
+GROUP_COUNT = 50
+# Сколько последних записей автора держать в кэше для ленты подписок
+RECENT_POSTS_LIMIT = 100
+RECENT_POSTS_TIMEOUT = 60 * 60 * 24
+# Сколько номеров страниц показывать по обе стороны от текущей
+PAGE_WINDOW = 2
+# Точный COUNT(*) только до этого числа записей, дальше - оценка
+COUNT_EXACT_LIMIT = 10000
+COUNT_TIMEOUT = 60 * 60
+# Отрисованные карточки записей; версия карточки меняется при правке
+CARD_TIMEOUT = 60 * 60 * 24
+# Карточка записи: кадр 960x339 в нескольких ширинах для srcset,
+# в WebP и JPEG; JPEG шириной 960 - src для старых браузеров
+CARD_WIDTHS = (480, 960, 1440)
+CARD_FORMATS = ('WEBP', 'JPEG')
+CARD_SIZES = '(max-width: 992px) 100vw, 960px'
+CARD_THUMBNAIL = ('960x339', {'crop': 'center', 'upscale': True,
+                              'format': 'JPEG'})
+# Миниатюры, которые готовятся в фоне после загрузки картинки:
+# (геометрия, параметры sorl-thumbnail)
+THUMBNAIL_GEOMETRIES = tuple(
+    (f'{width}x{round(width * 339 / 960)}',
+     {'crop': 'center', 'upscale': True, 'format': image_format})
+    for image_format in CARD_FORMATS for width in CARD_WIDTHS)
+# Исходник шире этого уменьшается при загрузке
+IMAGE_MAX_WIDTH = 2560
+# Ширина размытой заглушки, которая хранится в записи
+PLACEHOLDER_WIDTH = 16
+# Потоков для миниатюр; 0 - готовить сразу после коммита записи,
+# в том же процессе (так в тестах - см. yatube/settings_test.py)
+THUMBNAIL_WORKERS = getattr(
+    settings, 'THUMBNAIL_WORKERS',
+    int(os.environ.get('YATUBE_THUMBNAIL_WORKERS', 2)))
+# Пределы загружаемой картинки: байты файла и пиксели по заголовку
+IMAGE_MAX_BYTES = 10 * 2 ** 20
+IMAGE_MAX_PIXELS = 40 * 10 ** 6
+# Сколько первых байт загрузки держать, чтобы прочитать заголовок
+IMAGE_HEADER_BYTES = 256 * 2 ** 10
+# Сколько слов запроса учитывает поиск
+SEARCH_MAX_TERMS = 10
+# Популярные записи: комментарий теряет половину веса за
+# TRENDING_HALF_LIFE секунд, сама запись весит как TRENDING_POST_WEIGHT
+# комментариев в момент публикации; в списке - записи не старше
+# TRENDING_WINDOW секунд, не больше TRENDING_LIMIT
+TRENDING_HALF_LIFE = 6 * 60 * 60
+TRENDING_POST_WEIGHT = 3
+TRENDING_WINDOW = 3 * 24 * 60 * 60
+TRENDING_LIMIT = 100
+TRENDING_TIMEOUT = 10 * 60
+# Сколько разных тегов и упоминаний записи попадает в индекс
+TAGS_PER_POST = 20
+# Кого почитать: сколько авторов хранить на пользователя и показывать,
+# со скольких самых похожих читателей брать их подписки
+SUGGESTIONS_COUNT = 10
+SUGGESTIONS_SHOWN = 5
+SUGGESTIONS_MAX_COFOLLOWERS = 100
+# Сколько читателей одного автора смотреть при поиске похожих
+SUGGESTIONS_READERS_PER_AUTHOR = 200
+SUGGESTIONS_TIMEOUT = 2 * 24 * 60 * 60
+# Похожие записи (posts.duplicates): MinHash из MINHASH_PERMUTATIONS
+# значений по шинглам из SHINGLE_SIZE слов, LSH из MINHASH_BANDS полос;
+# повтором считается запись, у которой с более ранней совпадает не
+# меньше DUPLICATE_THRESHOLD значений; тексты короче DUPLICATE_MIN_WORDS
+# слов не сравниваются
+MINHASH_PERMUTATIONS = 64
+MINHASH_BANDS = 16
+SHINGLE_SIZE = 3
+DUPLICATE_THRESHOLD = 0.8
+DUPLICATE_MIN_WORDS = 5
@@ -0,0 +1,122 @@
+from django.core.cache import cache
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import (counters, duplicates, feeds, generations, media, suggestions,
+               thumbnails)
+from .models import Comment, Follow, Group, Post, User, UserStats
+from .utils import GROUPS_COUNT_KEY, count_key
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_init, sender=Post)
+def post_loaded(sender, instance, **kwargs):
+    # Группа, сохранённая в базе: после смены группы любым путём
+    # (форма, список в админке) запись переносится в счётчиках групп.
+    # Отложенное поле не читаем - это был бы запрос на каждую запись
+    if 'group_id' in instance.__dict__:
+        instance._stored_group_id = instance.group_id
+    # Так же картинка: ссылки на файл и миниатюры - при любой замене
+    if 'image' in instance.__dict__:
+        instance._stored_image = instance.image.name
+
+
+@receiver(pre_save, sender=Post)
+def post_signing(sender, instance, **kwargs):
+    if instance._state.adding and instance.signature is None:
+        instance.signature = duplicates.sign(instance.text)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    generations.bump(*generations.post_scopes(instance))
+    if created:
+        duplicates.index_post(instance)
+        counters.change_user(instance.author_id, 'posts_count', 1)
+        counters.change_group(instance.group_id, 1)
+        counters.add_last_post(instance)
+        generations.bump('groups')
+        feeds.fan_out(instance)
+        feeds.invalidate_recent_posts(instance.author_id)
+        cache.delete(count_key())
+        media.retain(instance.image.name)
+        thumbnails.schedule(instance)
+    else:
+        old_group_id = getattr(instance, '_stored_group_id',
+                               instance.group_id)
+        if old_group_id != instance.group_id:
+            counters.move_post(instance, old_group_id)
+            generations.bump(f'group:{old_group_id}', 'groups')
+        old_image = getattr(instance, '_stored_image', None)
+        if old_image is not None and old_image != instance.image.name:
+            media.release(old_image)
+            media.retain(instance.image.name)
+            thumbnails.schedule(instance)
+    instance._stored_group_id = instance.group_id
+    if 'image' in instance.__dict__:
+        instance._stored_image = instance.image.name
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    generations.bump(*generations.post_scopes(instance))
+    counters.change_user(instance.author_id, 'posts_count', -1)
+    counters.change_group(instance.group_id, -1)
+    counters.refresh_last_post(instance.group_id)
+    generations.bump('groups')
+    feeds.invalidate_recent_posts(instance.author_id)
+    # Записи из лент подписчиков удалил каскад
+    feeds.forget_counts(Follow.objects.filter(
+        author_id=instance.author_id).values_list('user_id', flat=True))
+    cache.delete(count_key())
+    media.release(instance.image.name)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    generations.bump('groups')
+    if created:
+        cache.delete(GROUPS_COUNT_KEY)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    generations.bump('groups')
+    cache.delete(GROUPS_COUNT_KEY)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    generations.bump(f'post:{instance.post_id}')
+    if created:
+        counters.change_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    generations.bump(f'post:{instance.post_id}')
+    counters.change_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        generations.bump(f'follow:{instance.user_id}')
+        counters.change_user(instance.user_id, 'following_count', 1)
+        counters.change_user(instance.author_id, 'followers_count', 1)
+        feeds.backfill(instance.user_id, instance.author_id)
+        suggestions.forget(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    generations.bump(f'follow:{instance.user_id}')
+    counters.change_user(instance.user_id, 'following_count', -1)
+    counters.change_user(instance.author_id, 'followers_count', -1)
+    feeds.remove(instance.user_id, instance.author_id)
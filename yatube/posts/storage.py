@@ -0,0 +1,57 @@
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_NAME = re.compile(r'^[\w/]*?([0-9a-f]{2})/\1[0-9a-f]{62}(\.\w+)?$')
+
+
+def is_blob(name):
+    """Имя дало хранилище по содержимому, а не старая загрузка."""
+    return bool(name) and BLOB_NAME.match(name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит каждый файл один раз - под SHA-256 его содержимого.
+
+    Имя файла - upload_to/аа/<хэш><расширение>, где аа - первые два
+    символа хэша: одинаковые загрузки получают одно и то же имя,
+    а по имени можно кэшировать файл навсегда. Сколько записей
+    ссылается на файл, считает posts.media.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        # Имя всё равно заменит хэш, совпадение имён - не конфликт
+        return name
+
+    def _save(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        name = os.path.join(directory, digest[:2], digest + extension)
+        if self.exists(name):
+            return name
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        # Пишем во временный файл и переименовываем: параллельная
+        # загрузка того же файла не увидит его недописанным
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(full_path))
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                for chunk in content.chunks():
+                    file.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return name
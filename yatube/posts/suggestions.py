@@ -0,0 +1,52 @@
+"""«Кого почитать»: готовые списки авторов в кэше.
+
+Списки считает периодическая команда build_suggestions по снимку графа
+подписок (posts.follow_graph); страницы только читают кэш. Подписка
+сразу убирает автора из списка пользователя.
+"""
+from django.core.cache import cache
+
+from .settings import SUGGESTIONS_SHOWN, SUGGESTIONS_TIMEOUT
+
+SUGGESTIONS_KEY = 'suggestions:{}'
+POPULAR_KEY = 'suggestions:popular'
+CHUNK_SIZE = 1000
+
+
+def store(suggested, popular, names):
+    """Кладёт в кэш списки {user_id: [author_id]} и общий список
+    популярных авторов как пары (id, username)."""
+    def named(author_ids):
+        return [(author_id, names[author_id]) for author_id in author_ids
+                if author_id in names]
+
+    cache.set(POPULAR_KEY, named(popular), SUGGESTIONS_TIMEOUT)
+    items = list(suggested.items())
+    for start in range(0, len(items), CHUNK_SIZE):
+        cache.set_many({
+            SUGGESTIONS_KEY.format(user_id): named(author_ids)
+            for user_id, author_ids in items[start:start + CHUNK_SIZE]
+        }, SUGGESTIONS_TIMEOUT)
+
+
+def _stored(user_id):
+    key = SUGGESTIONS_KEY.format(user_id)
+    found = cache.get_many([key, POPULAR_KEY])
+    return found.get(key, found.get(POPULAR_KEY, []))
+
+
+def for_user(user, count=SUGGESTIONS_SHOWN):
+    """Первые count авторов (id, username) для пользователя."""
+    if not user.is_authenticated:
+        return []
+    return [(author_id, username)
+            for author_id, username in _stored(user.id)
+            if author_id != user.id][:count]
+
+
+def forget(user_id, author_id):
+    """Убирает из списка пользователя автора, на которого он подписался."""
+    cache.set(SUGGESTIONS_KEY.format(user_id), [
+        suggestion for suggestion in _stored(user_id)
+        if suggestion[0] != author_id
+    ], SUGGESTIONS_TIMEOUT)
@@ -0,0 +1,102 @@
+"""#Теги и @упоминания в тексте записей и их обратный индекс (PostTag).
+
+Индекс обновляет PostForm при сохранении записи; записи, сохранённые
+в обход формы или до появления индекса, досчитывает команда
+index_post_tags.
+"""
+import re
+
+from django.contrib.auth import get_user_model
+
+from .models import FEED_FIELDS, PostTag
+from .settings import TAGS_PER_POST
+
+User = get_user_model()
+
+BATCH_SIZE = 500
+NAME_MAX_LENGTH = PostTag._meta.get_field('name').max_length
+# После & - HTML-сущность (&#39;), а не тег; после \w - не начало слова.
+# Слово длиннее NAME_MAX_LENGTH - не тег (не обрезаем его)
+TAG = re.compile(rf'(?<![\w&#])#(\w{{1,{NAME_MAX_LENGTH}}})(?!\w)')
+# Имя пользователя без завершающей точки: «@bob.» - это bob
+MENTION = re.compile(
+    rf'(?<![\w@.])@(\w(?:[\w.+-]{{0,{NAME_MAX_LENGTH - 2}}}\w)?)'
+    r'(?![\w.+-]*\w)')
+
+
+def extract(text):
+    """Теги (в нижнем регистре) и упоминания текста, по порядку
+    появления, всего не больше TAGS_PER_POST."""
+    found = {}
+    for kind, pattern in ((PostTag.TAG, TAG), (PostTag.MENTION, MENTION)):
+        for match in pattern.finditer(text):
+            name = match.group(1)
+            if kind == PostTag.TAG:
+                name = name.lower()
+            found.setdefault((kind, name), match.start())
+    return [key for key, _ in sorted(found.items(),
+                                     key=lambda item: item[1])
+            ][:TAGS_PER_POST]
+
+
+def _entries(rows):
+    """PostTag для строк (id, текст, дата публикации); упоминания
+    только существующих пользователей - одним запросом."""
+    extracted = [(post_id, pub_date, extract(text))
+                 for post_id, text, pub_date in rows]
+    mentioned = {name for _, _, found in extracted
+                 for kind, name in found if kind == PostTag.MENTION}
+    users = set(User.objects.filter(username__in=mentioned).values_list(
+        'username', flat=True)) if mentioned else set()
+    return [
+        PostTag(post_id=post_id, kind=kind, name=name, pub_date=pub_date)
+        for post_id, pub_date, found in extracted
+        for kind, name in found
+        if kind == PostTag.TAG or name in users
+    ]
+
+
+def index_posts(rows, replace=True):
+    """Записывает теги строк (id, текст, дата) в индекс; replace -
+    сначала убрать прежние теги этих записей."""
+    entries = _entries(rows)
+    if replace:
+        PostTag.objects.filter(
+            post_id__in=[row[0] for row in rows]).delete()
+    PostTag.objects.bulk_create(entries, batch_size=BATCH_SIZE,
+                                ignore_conflicts=True)
+    return len(entries)
+
+
+def index_post(post, old_text=''):
+    """Обновляет теги записи после сохранения; old_text - текст до
+    правки. Без тегов в старом и новом тексте запросов нет."""
+    row = (post.id, post.text, post.pub_date)
+    if extract(old_text):
+        index_posts([row])
+    elif extract(post.text):
+        index_posts([row], replace=False)
+
+
+def mentioned(posts):
+    """{id записи: имена из индекса} - упоминания, которые ведут на
+    существующих пользователей. Запрос - только если в текстах есть @."""
+    post_ids = [post.id for post in posts if MENTION.search(post.text)]
+    if not post_ids:
+        return {}
+    found = {}
+    for post_id, name in PostTag.objects.filter(
+            kind=PostTag.MENTION, post_id__in=post_ids
+    ).values_list('post_id', 'name'):
+        found.setdefault(post_id, set()).add(name)
+    return found
+
+
+def tagged(kind, name):
+    """Записи с тегом или упоминанием от новых к старым - диапазон
+    post_tag_name_date_idx; для CursorPaginator по (pub_date, post_id)."""
+    return PostTag.objects.filter(kind=kind, name=name).select_related(
+        'post__author', 'post__group'
+    ).only(
+        'pub_date', 'post', *(f'post__{field}' for field in FEED_FIELDS)
+    ).order_by('-pub_date', '-post_id')
@@ -0,0 +1,18 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page):
+    return page.paginator.page_window(page.number)
+
+
+@register.simple_tag(takes_context=True)
+def cursor_query(context, cursor):
+    """Строка запроса страницы с курсором: остальные параметры (q)
+    сохраняются."""
+    query = context['request'].GET.copy()
+    query.pop('page', None)
+    query['cursor'] = cursor
+    return query.urlencode()
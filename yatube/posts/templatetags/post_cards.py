@@ -0,0 +1,54 @@
+from django import template
+from django.urls import reverse
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+from posts import tags, thumbnails
+from posts.cards import render_cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, variant='feed'):
+    return render_cards(list(posts), variant)
+
+
+@register.simple_tag
+def post_picture(post):
+    """Миниатюры записи для <picture> или None - тогда нужна заглушка."""
+    picture = thumbnails.pictures([post.image]).get(post.image.name)
+    if picture is None and post.image:
+        thumbnails.schedule(post)
+    return picture
+
+
+@register.filter
+def picture_style(post):
+    """Место под кадр карточки и, если есть, цвет и размытая заглушка
+    из записи - без обращения к файлу."""
+    style = 'aspect-ratio: 960 / 339'
+    if post.image_placeholder:
+        style += (f'; background: {post.image_color} '
+                  f'url({post.image_placeholder}) center / cover')
+    return style
+
+
+@register.filter(needs_autoescape=True)
+def linkify(text, mentions=(), autoescape=True):
+    """#теги и @упоминания в тексте записи - ссылками; mentions - имена
+    существующих пользователей (tags.mentioned), остальные упоминания
+    остаются текстом."""
+    if autoescape:
+        text = conditional_escape(text)
+    text = tags.TAG.sub(lambda match: '<a href="{}">{}</a>'.format(
+        reverse('posts:tag', args=[match.group(1).lower()]),
+        match.group(0)), text)
+
+    def mention(match):
+        if match.group(1) not in mentions:
+            return match.group(0)
+        return '<a href="{}">{}</a>'.format(
+            reverse('posts:profile', args=[match.group(1)]),
+            match.group(0))
+    return mark_safe(tags.MENTION.sub(mention, text))
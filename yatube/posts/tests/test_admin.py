@@ -0,0 +1,71 @@
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from ..utils import EstimatedCountPaginator
+
+
+class AdminChangeListTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin')
+        cls.groups = [Group.objects.create(title=f'группа {number}',
+                                           slug=f'slug-{number}')
+                      for number in range(5)]
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def create_rows(self, count):
+        for number in range(count):
+            post = Post.objects.create(author=self.admin,
+                                       text=f'запись {number}',
+                                       group=self.groups[number % 5])
+            Comment.objects.create(post=post, author=self.admin,
+                                   text=f'комментарий {number}')
+
+    def changelist_queries(self, model):
+        url = reverse(f'admin:posts_{model}_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        """Число запросов списка не зависит от числа строк"""
+        Follow.objects.create(user=self.admin,
+                              author=User.objects.create_user('author'))
+        self.create_rows(2)
+        few = {model: self.changelist_queries(model)[1]
+               for model in ('post', 'comment', 'follow')}
+        self.create_rows(20)
+        for model, count in few.items():
+            with self.subTest(model=model):
+                self.assertEqual(self.changelist_queries(model)[1], count)
+
+    def test_group_not_rendered_as_full_select(self):
+        """В строке только выбранная группа, а не <select> со всеми"""
+        self.create_rows(1)
+        response, _ = self.changelist_queries('post')
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertContains(response, '>группа 0</option>', count=1)
+        self.assertNotContains(response, '>группа 1</option>')
+
+    def test_no_full_count(self):
+        """Общее число записей не считается, число строк - оценка"""
+        self.create_rows(1)
+        url = reverse('admin:posts_post_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        counts = [query['sql'] for query in queries
+                  if 'COUNT(' in query['sql']]
+        self.assertEqual(len(counts), 1)
+        self.assertIn('LIMIT', counts[0])
+        self.assertIsInstance(response.context['cl'].paginator,
+                              EstimatedCountPaginator)
@@ -0,0 +1,139 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Group, Post, User
+from ..settings import POST_COUNT
+from ..utils import NEXT, encode_cursor
+
+
+class ApiTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(title='Группа', slug='test-slug',
+                                         description='описание')
+        cls.posts = [Post.objects.create(author=cls.user, group=cls.group,
+                                         text=f'запись {n}')
+                     for n in range(POST_COUNT + 2)]
+        cls.post = cls.posts[0]
+        Comment.objects.create(post=cls.post, author=cls.user,
+                               text='комментарий')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get_json(self, url, **headers):
+        response = self.client.get(url, **headers)
+        self.assertEqual(response.status_code, 200)
+        return response, json.loads(b''.join(response.streaming_content)
+                                    if response.streaming
+                                    else response.content)
+
+    def test_feeds_paged_by_cursor(self):
+        """Ленты листаются курсором от новых записей к старым"""
+        urls = (
+            reverse('posts:api_index'),
+            reverse('posts:api_group', args=[self.group.slug]),
+            reverse('posts:api_profile', args=[self.user.username]),
+        )
+        expected = [post.id for post in reversed(self.posts)]
+        for url in urls:
+            with self.subTest(url=url):
+                _, first = self.get_json(url)
+                _, second = self.get_json(f'{url}?cursor={first["next"]}')
+                ids = [row['id'] for row in
+                       first['results'] + second['results']]
+                self.assertEqual(ids, expected)
+                self.assertIsNone(first['previous'])
+                self.assertIsNone(second['next'])
+                self.assertEqual(first['results'][0]['author'], 'auth')
+                self.assertEqual(first['results'][0]['group'], 'test-slug')
+
+    def test_fields_selected(self):
+        """?fields= оставляет только перечисленные поля"""
+        _, data = self.get_json(
+            reverse('posts:api_index') + '?fields=id,text')
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        response = self.client.get(
+            reverse('posts:api_index') + '?fields=id,password')
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_detail_with_comments(self):
+        """Запись отдаётся с комментариями"""
+        _, data = self.get_json(
+            reverse('posts:api_post', args=[self.post.id]))
+        self.assertEqual(data['text'], self.post.text)
+        self.assertEqual([comment['text'] for comment in data['comments']],
+                         ['комментарий'])
+        self.assertEqual(data['comments'][0]['author'], 'auth')
+        response = self.client.get(reverse('posts:api_post', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_not_modified_without_queries(self):
+        """Неизменившаяся страница - 304 без запросов к записям"""
+        url = reverse('posts:api_index')
+        response, _ = self.get_json(url)
+        etag = response['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_scope(self):
+        """Новая запись в группе меняет ETag группы, а не чужого
+        профиля"""
+        other = User.objects.create_user(username='other')
+        group_url = reverse('posts:api_group', args=[self.group.slug])
+        other_url = reverse('posts:api_profile', args=[other.username])
+        group_etag = self.get_json(group_url)[0]['ETag']
+        other_etag = self.get_json(other_url)[0]['ETag']
+        Post.objects.create(author=self.user, group=self.group,
+                            text='новая')
+        response = self.client.get(group_url,
+                                   HTTP_IF_NONE_MATCH=group_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], group_etag)
+        response = self.client.get(other_url,
+                                   HTTP_IF_NONE_MATCH=other_etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_comments_count_only_on_post(self):
+        """Комментарий не меняет ленту (в ней нет их числа), но меняет
+        ETag записи"""
+        feed_url = reverse('posts:api_index')
+        post_url = reverse('posts:api_post', args=[self.post.id])
+        feed, data = self.get_json(feed_url)
+        self.assertNotIn('comments_count', data['results'][0])
+        response = self.client.get(feed_url + '?fields=comments_count')
+        self.assertEqual(response.status_code, 400)
+        post_etag = self.get_json(post_url)[0]['ETag']
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='ещё')
+        response = self.client.get(post_url, HTTP_IF_NONE_MATCH=post_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['comments_count'], 2)
+
+    def test_bad_cursor_gives_first_page(self):
+        """Испорченный курсор или курсор с числом вместо даты - первая
+        страница"""
+        url = reverse('posts:api_index')
+        _, first = self.get_json(url)
+        for cursor in ('мусор', 'bjEuNXwz', encode_cursor(NEXT, 1.5, 3)):
+            with self.subTest(cursor=cursor):
+                _, data = self.get_json(f'{url}?cursor={cursor}')
+                self.assertEqual(data, first)
+
+    def test_etag_depends_on_query(self):
+        """Разные страницы одной ленты - разные ETag"""
+        url = reverse('posts:api_index')
+        first, data = self.get_json(url)
+        second, _ = self.get_json(f'{url}?cursor={data["next"]}')
+        self.assertNotEqual(first['ETag'], second['ETag'])
@@ -1,7 +1,12 @@
+from unittest import mock
+
+from django.core.cache import cache
 from django.urls import reverse
 from django.test import TestCase, Client
 
-from ..models import Post, User
+from ..cards import card_key, render_cards
+from ..models import Comment, Group, Post, User
+from ..utils import CachedCountPaginator, count_key, estimate_count
 
 
 class CachesTests(TestCase):
@@ -10,18 +15,150 @@ class CachesTests(TestCase):
     def setUpClass(cls):
         super().setUpClass()
         cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(slug='test-slug')
         cls.post = Post.objects.create(
             author=cls.user,
             text='текст поста',
+            group=cls.group,
         )
+        cls.urls = [
+            reverse('posts:home_page'),
+            reverse('posts:group_list', args=[cls.group.slug]),
+            reverse('posts:profile', args=[cls.user.username]),
+        ]
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
 
     def test_cache(self):
-        content_post = self.client.get(
-            reverse('posts:home_page')).content
-        self.post.delete()
-        content_delete_post = self.client.get(
-            reverse('posts:home_page')).content
-        self.assertEqual(content_post, content_delete_post)
+        """Фрагмент ленты берётся из кэша, пока записи не менялись"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                content_post = self.client.get(url).content
+                # update() не отправляет сигналов - поколение прежнее
+                Post.objects.filter(pk=self.post.pk).update(
+                    text='изменено в обход модели')
+                self.assertEqual(self.client.get(url).content, content_post)
+                Post.objects.filter(pk=self.post.pk).update(
+                    text=self.post.text)
+
+    def test_cache_refreshed_after_write(self):
+        """Запись и удаление поста сразу видны в лентах"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.client.get(url)
+                post = Post.objects.create(author=self.user,
+                                           group=self.group,
+                                           text='свежая запись')
+                self.assertContains(self.client.get(url), 'свежая запись')
+                post.delete()
+                self.assertNotContains(self.client.get(url),
+                                       'свежая запись')
+
+    def test_comments_refreshed_after_comment(self):
+        """Новый комментарий сразу виден на странице записи"""
+        url = reverse('posts:post_detail', args=[self.post.id])
+        self.client.get(url)
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='свежий комментарий')
+        self.assertContains(self.client.get(url), 'свежий комментарий')
+
+
+class CardCacheTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(slug='test-slug', title='Группа')
+        Post.objects.bulk_create(
+            Post(author=cls.user, group=cls.group, text=f'запись {number}')
+            for number in range(3))
+
+    def setUp(self):
+        cache.clear()
+        self.posts = list(Post.objects.for_feed())
+
+    def test_cards_fetched_with_one_get_many(self):
+        """Страница карточек - одно обращение к кэшу, рендер только промахов"""
+        render_cards(self.posts[:1])
+        with mock.patch('posts.cards.render_to_string',
+                        return_value='') as render, \
+                mock.patch('posts.cards.cache.get_many',
+                           wraps=cache.get_many) as get_many:
+            cards = render_cards(self.posts)
+        get_many.assert_called_once()
+        self.assertEqual(render.call_count, len(self.posts) - 1)
+        self.assertIn('запись', cards[0])
+
+    def test_card_key_changes_on_edit(self):
+        """Правка текста или группы меняет версию карточки"""
+        post = self.posts[0]
+        key = card_key(post, 'feed')
+        post.text = 'исправлено'
+        self.assertNotEqual(card_key(post, 'feed'), key)
+        post.text = self.posts[1].text
+        post.group = None
+        self.assertNotEqual(card_key(post, 'feed'), key)
+
+    def test_variants_hide_author_or_group(self):
+        """В профиле нет автора, в группе - ссылки на группу"""
+        post = self.posts[0]
+        feed, group, profile = (render_cards([post], variant)[0]
+                                for variant in ('feed', 'group', 'profile'))
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        author_url = reverse('posts:profile', args=[self.user.username])
+        self.assertIn(group_url, feed)
+        self.assertIn(author_url, feed)
+        self.assertNotIn(group_url, group)
+        self.assertNotIn(author_url, profile)
+        self.assertIn(group_url, profile)
+
+
+class CountCacheTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'текст {i}') for i in range(30))
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_is_cached(self):
+        """Число записей считается один раз и берётся из кэша"""
+        paginator = CachedCountPaginator(
+            Post.objects.all(), 10, count_key=count_key())
+        self.assertEqual(paginator.count, 30)
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                CachedCountPaginator(Post.objects.all(), 10,
+                                     count_key=count_key()).count,
+                30)
+
+    def test_count_invalidated_on_create_and_delete(self):
+        """Создание и удаление записи сбрасывают число всех записей"""
+        cache.set(count_key(), 30)
+        post = Post.objects.create(author=self.user, text='ещё')
+        self.assertIsNone(cache.get(count_key()))
+        cache.set(count_key(), 31)
+        post.delete()
+        self.assertIsNone(cache.get(count_key()))
+
+    @mock.patch('posts.utils.COUNT_EXACT_LIMIT', 10)
+    def test_estimate_count(self):
+        """Большие выборки оцениваются по диапазону ключей"""
+        self.assertEqual(estimate_count(Post.objects.all()), 30)
+        self.assertEqual(
+            estimate_count(Post.objects.filter(text='текст 1')), 1)
+
+    @mock.patch('posts.utils.PAGE_WINDOW', 2)
+    def test_page_window(self):
+        """Навигация показывает окно страниц вокруг текущей"""
+        paginator = CachedCountPaginator(Post.objects.all(), 2)
+        self.assertEqual(list(paginator.page_window(1)), [1, 2, 3])
+        self.assertEqual(list(paginator.page_window(8)), [6, 7, 8, 9, 10])
+        self.assertEqual(list(paginator.page_window(15)), [13, 14, 15])
@@ -0,0 +1,88 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User, UserStats
+
+
+class CountersTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group_lists = [Group.objects.create(slug=slug)
+                           for slug in ('slug1', 'slug2')]
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый текст',
+            group=cls.group_lists[0],
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def assertCounters(self, posts, group_posts, comments,
+                       followers, following):
+        author_stats = UserStats.objects.get(user=self.author)
+        reader_stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual(author_stats.posts_count, posts)
+        self.assertEqual(
+            [group.posts_count for group in Group.objects.order_by('slug')],
+            group_posts)
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).comments_count, comments)
+        self.assertEqual(author_stats.followers_count, followers)
+        self.assertEqual(reader_stats.following_count, following)
+
+    def test_counters_follow_views(self):
+        """Счётчики меняются вместе с записями, комментариями и
+        подписками"""
+        self.assertCounters(1, [1, 0], 0, 0, 0)
+        self.author_client.post(reverse('posts:post_create'), {
+            'text': 'ещё запись', 'group': self.group_lists[1].pk})
+        self.reader_client.post(
+            reverse('posts:add_comment', args=[self.post.id]),
+            {'text': 'комментарий'})
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+        self.assertCounters(2, [1, 1], 1, 1, 1)
+        self.author_client.post(
+            reverse('posts:post_edit', args=[self.post.id]),
+            {'text': 'правка', 'group': self.group_lists[1].pk})
+        self.assertCounters(2, [0, 2], 1, 1, 1)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        Comment.objects.all().delete()
+        Post.objects.exclude(pk=self.post.pk).delete()
+        self.assertCounters(1, [0, 1], 0, 0, 0)
+
+    def test_group_change_outside_views(self):
+        """Смена группы при любом сохранении (как в списке админки)
+        переносит запись в счётчиках и последней записи групп"""
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = self.group_lists[1]
+        post.save()
+        self.assertCounters(1, [0, 1], 0, 0, 0)
+        old, new = Group.objects.order_by('slug')
+        self.assertIsNone(old.last_post_date)
+        self.assertEqual(new.last_post_date, post.pub_date)
+        post.save()
+        self.assertCounters(1, [0, 1], 0, 0, 0)
+
+    def test_reconcile_counters(self):
+        """reconcile_counters восстанавливает испорченные счётчики"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Comment.objects.create(post=self.post, author=self.reader,
+                               text='комментарий')
+        UserStats.objects.all().delete()
+        Group.objects.update(posts_count=7)
+        Post.objects.update(comments_count=0)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertCounters(1, [1, 0], 1, 1, 1)
@@ -0,0 +1,127 @@
+from io import StringIO
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import duplicates
+from ..models import Post, PostBand, User
+from ..settings import DUPLICATE_THRESHOLD, MINHASH_BANDS
+
+SPAM = ('Только сегодня скидка девяносто процентов на все курсы, '
+        'переходите по ссылке в профиле и забирайте подарок')
+VARIANT = ('Только сегодня скидка девяносто процентов на все курсы, '
+           'переходите по ссылке в профиле и забирайте подарок!!! '
+           'подарок')
+OTHER = ('Сходили с друзьями в горы, погода была отличная, '
+         'вернулись к вечеру уставшие и довольные')
+
+
+class SignatureTests(TestCase):
+
+    def similarity(self, first, second):
+        return np.mean(duplicates.signature(first)
+                       == duplicates.signature(second))
+
+    def test_similar_texts_share_signature(self):
+        """Сигнатуры похожих текстов почти совпадают, разных - нет"""
+        self.assertGreaterEqual(self.similarity(SPAM, VARIANT),
+                                DUPLICATE_THRESHOLD)
+        self.assertLess(self.similarity(SPAM, OTHER), 0.2)
+
+    def test_short_text_not_signed(self):
+        """Короткий текст не сравнивается"""
+        self.assertIsNone(duplicates.signature('Всем привет'))
+        self.assertEqual(duplicates.sign('Всем привет'), b'')
+
+    def test_cluster_links_to_earliest(self):
+        """Кластер повторов сводится к самой ранней записи"""
+        signatures = np.stack([duplicates.signature(text) for text in (
+            OTHER, SPAM, VARIANT, SPAM + ' ещё')])
+        self.assertEqual(duplicates.cluster(signatures).tolist(),
+                         [0, 1, 1, 1])
+
+
+class DuplicateIndexTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.spammer = User.objects.create_user(username='spammer')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_repeat_marked_on_create(self):
+        """Повтор помечается при создании, в индексе - только оригинал"""
+        original = Post.objects.create(author=self.user, text=SPAM)
+        repeat = Post.objects.create(author=self.spammer, text=VARIANT)
+        other = Post.objects.create(author=self.user, text=OTHER)
+        repeat.refresh_from_db()
+        self.assertEqual(repeat.duplicate_of_id, original.id)
+        self.assertIsNone(Post.objects.get(pk=other.pk).duplicate_of_id)
+        self.assertEqual(
+            sorted(set(PostBand.objects.values_list('post_id', flat=True))),
+            [original.id, other.id])
+        self.assertEqual(
+            PostBand.objects.filter(post=original).count(), MINHASH_BANDS)
+
+    def test_repeat_of_repeat_points_to_original(self):
+        """Повтор повтора из индекса ссылается на первую запись"""
+        original = Post.objects.create(author=self.user, text=SPAM)
+        repeat = Post.objects.create(author=self.spammer, text=VARIANT)
+        keys = duplicates.band_keys(
+            duplicates.signature(VARIANT)[np.newaxis])[0]
+        PostBand.objects.bulk_create(
+            PostBand(key=key, post=repeat) for key in keys.tolist())
+        third = Post.objects.create(author=self.spammer, text=VARIANT)
+        self.assertEqual(third.duplicate_of_id, original.id)
+
+    def test_lookup_is_one_query(self):
+        """Проверка новой записи - один запрос к индексу и одна запись"""
+        Post.objects.create(author=self.user, text=SPAM)
+        post = Post.objects.create(author=self.spammer, text=VARIANT)
+        post.duplicate_of = None
+        with self.assertNumQueries(2):
+            self.assertIsNotNone(duplicates.index_post(post))
+
+    def test_repeat_collapsed_in_feed(self):
+        """В ленте повтор свёрнут и ссылается на оригинал"""
+        original = Post.objects.create(author=self.user, text=SPAM)
+        Post.objects.create(author=self.spammer, text=VARIANT)
+        response = Client().get(reverse('posts:home_page'))
+        self.assertContains(response, '<details>', count=1)
+        self.assertContains(response, reverse('posts:post_detail',
+                                              args=[original.id]))
+
+    def test_edit_resets_signature(self):
+        """Правка текста сбрасывает сигнатуру до пересчёта командой"""
+        post = Post.objects.create(author=self.user, text=OTHER)
+        client = Client()
+        client.force_login(self.user)
+        client.post(reverse('posts:post_edit', args=[post.id]),
+                    data={'text': SPAM})
+        post.refresh_from_db()
+        self.assertIsNone(post.signature)
+
+    def test_command_reclusters_all_posts(self):
+        """Команда подписывает старые записи, размечает повторы и
+        пересобирает индекс"""
+        original = Post.objects.create(author=self.user, text=SPAM)
+        repeats = [Post.objects.create(author=self.spammer, text=text)
+                   for text in (VARIANT, SPAM)]
+        short = Post.objects.create(author=self.user, text='Всем привет')
+        Post.objects.update(signature=None, duplicate_of=None)
+        PostBand.objects.all().delete()
+        call_command('find_duplicates', stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.filter(duplicate_of=original).order_by(
+                'id').values_list('id', flat=True)),
+            [post.id for post in repeats])
+        self.assertEqual(Post.objects.get(pk=short.pk).signature, b'')
+        self.assertEqual(
+            set(PostBand.objects.values_list('post_id', flat=True)),
+            {original.id})
@@ -0,0 +1,133 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..feeds import FollowFeed, recent_posts
+from ..models import FeedEntry, Follow, Post, User
+
+
+class FeedEntryTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.old_post = Post.objects.create(
+            author=cls.author,
+            text='запись до подписки',
+        )
+
+    def feed(self):
+        return list(FeedEntry.objects.filter(
+            user=self.follower).values_list('post_id', flat=True))
+
+    def test_follow_backfills_feed(self):
+        """Подписка добавляет в ленту прежние записи автора"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        self.assertEqual(self.feed(), [self.old_post.id])
+
+    def test_new_post_fans_out(self):
+        """Новая запись попадает в ленты подписчиков"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        post = Post.objects.create(author=self.author, text='новая запись')
+        self.assertEqual(self.feed(), [post.id, self.old_post.id])
+
+    def test_unfollow_clears_feed(self):
+        """Отписка убирает записи автора из ленты"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        Follow.objects.filter(user=self.follower).delete()
+        self.assertEqual(self.feed(), [])
+
+    def test_rebuild_inboxes(self):
+        """Команда rebuild_inboxes восстанавливает ленты"""
+        Follow.objects.create(user=self.follower, author=self.author)
+        FeedEntry.objects.all().delete()
+        call_command('rebuild_inboxes', stdout=StringIO())
+        self.assertEqual(self.feed(), [self.old_post.id])
+
+
+class FollowFeedTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        authors = [User.objects.create_user(username=f'author{i}')
+                   for i in range(3)]
+        for i in range(12):
+            Post.objects.create(author=authors[i % 3], text=f'запись {i}')
+        for author in authors:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch('posts.feeds.RECENT_POSTS_LIMIT', 5)
+    def test_merge_matches_inbox(self):
+        """Слияние списков из кэша и чтение FeedEntry дают одну ленту"""
+        feed = FollowFeed(self.reader)
+        expected = [entry.post for entry in feed.entries]
+        self.assertEqual(feed.count(), 12)
+        self.assertEqual(feed[0:5] + feed[5:10] + feed[10:15], expected)
+
+    def test_merge_reads_cache(self):
+        """Повторная сборка первой страницы не читает списки авторов"""
+        feed = FollowFeed(self.reader)
+        feed[0:10]
+        # подписки и записи страницы
+        with self.assertNumQueries(2):
+            feed[0:10]
+
+    def test_cold_cache_loads_authors_at_once(self):
+        """Списки всех авторов без кэша читаются одним запросом"""
+        feed = FollowFeed(self.reader)
+        # подписки, списки авторов и записи страницы
+        with self.assertNumQueries(3):
+            feed[0:10]
+
+    @mock.patch('posts.feeds.RECENT_POSTS_LIMIT', 2)
+    def test_recent_posts_capped_per_author(self):
+        """В кэш попадают только последние записи каждого автора"""
+        lists = recent_posts(
+            User.objects.filter(username__startswith='author').values_list(
+                'id', flat=True))
+        for author_id, posts in lists.items():
+            with self.subTest(author=author_id):
+                self.assertEqual(posts, [
+                    (pub_date.timestamp(), post_id)
+                    for pub_date, post_id in Post.objects.filter(
+                        author_id=author_id).values_list(
+                        'pub_date', 'id')[:2]])
+
+    def test_new_post_invalidates_author_list(self):
+        """Новая запись сразу видна в слитой ленте"""
+        feed = FollowFeed(self.reader)
+        feed[0:10]
+        post = Post.objects.create(
+            author=User.objects.get(username='author0'), text='новая')
+        self.assertEqual(feed[0:1], [post])
+
+    def test_count_cached(self):
+        """Число записей ленты считается один раз, потом берётся из кэша"""
+        with self.assertNumQueries(1):
+            self.assertEqual(FollowFeed(self.reader).count(), 12)
+        with self.assertNumQueries(0):
+            self.assertEqual(FollowFeed(self.reader).count(), 12)
+
+    def test_count_follows_feed_changes(self):
+        """Кэш числа записей сбрасывается при каждом изменении ленты"""
+        author = User.objects.get(username='author0')
+        feed = FollowFeed(self.reader)
+        feed.count()
+        post = Post.objects.create(author=author, text='новая')
+        self.assertEqual(feed.count(), 13)
+        post.delete()
+        self.assertEqual(feed.count(), 12)
+        Follow.objects.filter(user=self.reader, author=author).delete()
+        self.assertEqual(feed.count(), 8)
+        Follow.objects.create(user=self.reader, author=author)
+        self.assertEqual(feed.count(), 12)
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -87,8 +88,10 @@ class PostCreateFormTests(TestCase):
         self.assertEqual(post.author, self.user)
         self.assertEqual(post.text, form_data['text'])
         self.assertEqual(post.group.pk, form_data['group'])
+        # Файл хранится под SHA-256 содержимого
+        digest = hashlib.sha256(small_gif).hexdigest()
         self.assertTrue(Post.objects.filter(
-            image=f'posts/{form_data["image"].name}').exists())
+            image=f'posts/{digest[:2]}/{digest}.gif').exists())
 
     def test_post_edit(self):
         """Валидная форма редактирует запись в Post."""
@@ -0,0 +1,84 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Group, Post, User
+
+
+class GroupIndexTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group, cls.other = [
+            Group.objects.create(title=title, slug=title)
+            for title in ('first', 'second')]
+
+    def setUp(self):
+        cache.clear()
+
+    def last_post(self, group):
+        group.refresh_from_db()
+        return group.last_post_date, group.last_post_author_id
+
+    def test_last_post_follows_writes(self):
+        """Последняя запись группы обновляется при создании, переносе
+        и удалении записей"""
+        old = Post.objects.create(author=self.author, text='старая',
+                                  group=self.group)
+        new = Post.objects.create(author=self.reader, text='новая',
+                                  group=self.group)
+        self.assertEqual(self.last_post(self.group),
+                         (new.pub_date, self.reader.id))
+        client = Client()
+        client.force_login(self.reader)
+        client.post(reverse('posts:post_edit', args=[new.id]),
+                    data={'text': 'новая', 'group': self.other.id})
+        self.assertEqual(self.last_post(self.group),
+                         (old.pub_date, self.author.id))
+        self.assertEqual(self.last_post(self.other),
+                         (new.pub_date, self.reader.id))
+        old.delete()
+        self.assertEqual(self.last_post(self.group), (None, None))
+
+    def test_reconcile_fills_last_post(self):
+        """reconcile_counters восстанавливает последнюю запись"""
+        post = Post.objects.create(author=self.author, text='запись',
+                                   group=self.group)
+        Group.objects.update(last_post_date=None, last_post_author=None)
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.last_post(self.group),
+                         (post.pub_date, self.author.id))
+
+    def test_directory_page(self):
+        """Каталог показывает группы с числом записей и последним
+        автором и без записей в базе отдаётся из кэша"""
+        Post.objects.create(author=self.author, text='запись',
+                            group=self.group)
+        client = Client()
+        url = reverse('posts:group_index')
+        with self.assertNumQueries(2):
+            response = client.get(url)
+        self.assertEqual(list(response.context['page_obj']),
+                         [self.group, self.other])
+        self.assertContains(response, 'Записей: 1')
+        self.assertContains(response, 'auth')
+        with self.assertNumQueries(0):
+            client.get(url)
+
+    def test_directory_invalidated_by_writes(self):
+        """Новая запись и новая группа видны в каталоге сразу"""
+        client = Client()
+        url = reverse('posts:group_index')
+        client.get(url)
+        Post.objects.create(author=self.reader, text='запись',
+                            group=self.other)
+        Group.objects.create(title='third', slug='third')
+        response = client.get(url)
+        self.assertContains(response, 'reader')
+        self.assertContains(response, 'third')
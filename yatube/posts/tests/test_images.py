@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..models import Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageDescriptionTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    @staticmethod
+    def png(name, size=(40, 20), color='red'):
+        buffer = BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(),
+                                  content_type='image/png')
+
+    def test_description_saved_with_image(self):
+        """Размеры, цвет и заглушка сохраняются вместе с картинкой"""
+        client = Client()
+        client.force_login(self.user)
+        client.post(reverse('posts:post_create'), data={
+            'text': 'с картинкой', 'image': self.png('red.png')})
+        post = Post.objects.get(text='с картинкой')
+        self.assertEqual((post.image_width, post.image_height), (40, 20))
+        self.assertEqual(post.image_color, '#ff0000')
+        self.assertTrue(
+            post.image_placeholder.startswith('data:image/jpeg;base64,'))
+
+    def test_description_replaced_in_admin(self):
+        """Замена картинки в админке обновляет и её описание"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='admin')
+        post = Post.objects.create(author=admin, text='в админке',
+                                   image=self.png('red.png'))
+        client = Client()
+        client.force_login(admin)
+        client.post(reverse('admin:posts_post_change', args=[post.id]), {
+            'text': post.text, 'author': admin.id, 'group': '',
+            'duplicate_of': '',
+            'image': self.png('wide.png', size=(60, 10), color='blue')})
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (60, 10))
+        self.assertEqual(post.image_color, '#0000ff')
+
+    def test_backfill_command(self):
+        """Команда заполняет описание у старых записей"""
+        post = Post.objects.create(author=self.user, text='старая',
+                                   image=self.png('old.png', color='blue'))
+        self.assertIsNone(post.image_width)
+        call_command('backfill_image_descriptions', workers=2,
+                     stdout=StringIO(), stderr=StringIO())
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (40, 20))
+        self.assertEqual(post.image_color, '#0000ff')
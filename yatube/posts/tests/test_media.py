@@ -0,0 +1,103 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from .. import media
+from ..models import ImageBlob, Post, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+# Тот же GIF с другой палитрой - другой файл
+OTHER_GIF = SMALL_GIF.replace(b'\xFF\xFF\xFF', b'\x00\x00\xFF', 1)
+
+
+def run_on_commit(callback):
+    callback()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('posts.media.transaction.on_commit', run_on_commit)
+@mock.patch('posts.thumbnails.transaction.on_commit', run_on_commit)
+class ContentAddressedStorageTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, filename, content=SMALL_GIF):
+        return Post.objects.create(
+            author=self.user, text='запись',
+            image=SimpleUploadedFile(filename, content,
+                                     content_type='image/gif'))
+
+    def test_identical_uploads_stored_once(self):
+        """Одинаковые файлы под разными именами - один файл на диске"""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(
+            len(os.listdir(os.path.dirname(first.image.path))), 1)
+        self.assertEqual(
+            ImageBlob.objects.get(name=first.image.name).references, 2)
+
+    def test_file_deleted_with_last_reference(self):
+        """Файл удаляется вместе с последней записью, которая его показывает"""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif')
+        path = first.image.path
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def test_legacy_thumbnails_invalidated_on_release(self):
+        """У картинки не из хранилища по содержимому сбрасываются
+        миниатюры, а файл остаётся"""
+        with mock.patch('posts.thumbnails.default.kvstore') as kvstore:
+            media.release('posts/legacy.gif')
+        kvstore.delete.assert_called_once()
+        self.assertEqual(kvstore.delete.call_args[0][0].name,
+                         'posts/legacy.gif')
+
+    def test_recount(self):
+        """recount восстанавливает ссылки по записям"""
+        post = self.create_post('first.gif')
+        ImageBlob.objects.all().delete()
+        media.recount()
+        self.assertEqual(
+            ImageBlob.objects.get(name=post.image.name).references, 1)
+
+    def test_image_replaced_outside_views(self):
+        """Замена картинки любым путём (например, в админке) переносит
+        ссылку со старого файла на новый"""
+        first = self.create_post('first.gif')
+        second = self.create_post('second.gif', OTHER_GIF)
+        old_name = first.image.name
+        post = Post.objects.get(id=first.id)
+        post.image = second.image.name
+        post.save()
+        second.delete()
+        self.assertTrue(os.path.exists(post.image.path))
+        self.assertEqual(
+            ImageBlob.objects.get(name=post.image.name).references, 1)
+        self.assertFalse(ImageBlob.objects.filter(name=old_name).exists())
+        self.assertFalse(os.path.exists(first.image.path))
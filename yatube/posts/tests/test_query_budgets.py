@@ -0,0 +1,136 @@
+from unittest import mock
+
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import (QueryBudgetExceeded, QueryCounter,
+                             outside_query_budget)
+
+from .. import urls, views
+from ..models import Comment, Follow, Group, Post, User
+from ..settings import POST_COUNT
+from .utils import QueryBudgetMixin
+
+USERNAMES = ['auth', 'reader']
+SLUGS = ['test-slug1', 'test-slug2']
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Лимиты запросов на лентах в несколько страниц."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author, cls.reader = [User.objects.create_user(username=name)
+                                  for name in USERNAMES]
+        groups = [Group.objects.create(slug=slug, title=slug)
+                  for slug in SLUGS]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(POST_COUNT * 3):
+            Post.objects.create(author=cls.author, group=groups[i % 2],
+                                text=f'текст поста {i}')
+        cls.post = Post.objects.first()
+        for i in range(POST_COUNT):
+            Comment.objects.create(post=cls.post, author=cls.reader,
+                                   text=f'комментарий {i}')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_every_url_declares_budget(self):
+        """Каждый адрес posts.urls объявляет лимит запросов"""
+        for pattern in urls.urlpatterns:
+            with self.subTest(name=pattern.name):
+                self.assertTrue(hasattr(pattern.callback, 'query_budget'))
+
+    def test_pages_within_budget(self):
+        """Страницы укладываются в объявленный лимит"""
+        post_url = reverse('posts:post_detail', args=[self.post.id])
+        pages = [
+            reverse('posts:home_page'),
+            reverse('posts:group_list', args=[SLUGS[0]]),
+            reverse('posts:profile', args=[USERNAMES[0]]),
+            reverse('posts:follow_index'),
+            reverse('posts:trending'),
+            reverse('posts:group_index'),
+            reverse('posts:tag', args=['тег']),
+            reverse('posts:mentions', args=[USERNAMES[0]]),
+            reverse('posts:search') + '?q=текст&',
+            post_url,
+            reverse('posts:post_edit', args=[self.post.id]),
+            reverse('posts:post_create'),
+            reverse('posts:api_index'),
+            reverse('posts:api_group', args=[SLUGS[0]]),
+            reverse('posts:api_profile', args=[USERNAMES[0]]),
+            reverse('posts:api_post', args=[self.post.id]),
+        ]
+        for url in pages:
+            for query in ('', '?page=2', '?page=3', '?cursor='):
+                for client in (self.reader_client, self.author_client):
+                    with self.subTest(url=url + query):
+                        self.assertWithinQueryBudget(client, url + query)
+        self.assertWithinQueryBudget(
+            self.guest_client, reverse('posts:home_page'))
+
+    def test_writes_within_budget(self):
+        """Создание записей, комментариев и подписок укладывается
+        в лимит"""
+        self.assertWithinQueryBudget(
+            self.author_client, reverse('posts:post_create'), 'post',
+            {'text': 'новая запись'})
+        # Длинный текст ещё и сверяется с индексом похожих записей
+        self.assertWithinQueryBudget(
+            self.author_client, reverse('posts:post_create'), 'post',
+            {'text': 'новая длинная запись из шести слов'})
+        self.assertWithinQueryBudget(
+            self.author_client,
+            reverse('posts:post_edit', args=[self.post.id]), 'post',
+            {'text': 'правка', 'group': ''})
+        self.assertWithinQueryBudget(
+            self.reader_client,
+            reverse('posts:add_comment', args=[self.post.id]), 'post',
+            {'text': 'комментарий'})
+        self.assertWithinQueryBudget(
+            self.reader_client,
+            reverse('posts:profile_unfollow', args=[USERNAMES[0]]))
+        self.assertWithinQueryBudget(
+            self.reader_client,
+            reverse('posts:profile_follow', args=[USERNAMES[0]]))
+
+    @override_settings(QUERY_BUDGET_STRICT=False)
+    def test_middleware_logs_breach(self):
+        """Превышение лимита пишется в лог, ответ не ломается"""
+        with mock.patch.object(views.index, 'query_budget', 0):
+            with self.assertLogs('core.middleware', 'WARNING'):
+                response = self.reader_client.get(reverse('posts:home_page'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_server_timing_opt_in(self):
+        """Время работы базы отдаётся клиенту только по настройке"""
+        url = reverse('posts:home_page')
+        self.assertNotIn('Server-Timing', self.reader_client.get(url))
+        with self.settings(QUERY_BUDGET_SERVER_TIMING=True):
+            response = self.reader_client.get(url)
+        self.assertRegex(response['Server-Timing'],
+                         r'^db;dur=[\d.]+;desc="\d+ queries"$')
+
+    @override_settings(QUERY_BUDGET_STRICT=True)
+    def test_middleware_raises_in_strict_mode(self):
+        """В строгом режиме превышение лимита - ошибка"""
+        with mock.patch.object(views.index, 'query_budget', 0):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.reader_client.get(reverse('posts:home_page'))
+
+    def test_background_work_not_counted(self):
+        """Фоновая работа в потоке запроса не входит в лимит"""
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            Post.objects.count()
+            with outside_query_budget():
+                Post.objects.count()
+        self.assertEqual(counter.count, 1)
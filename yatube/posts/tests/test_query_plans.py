@@ -0,0 +1,99 @@
+import datetime as dt
+
+from django.contrib.admin.sites import site
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .. import tags
+from ..models import (Comment, FeedEntry, Follow, Group, Post, PostBand,
+                      PostTag, User)
+from ..utils import CursorPaginator
+
+
+class QueryPlanTests(TestCase):
+    """Запросы лент читают индекс по порядку, без полного просмотра
+    таблицы и сортировки во временном B-дереве."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(slug='test-slug')
+        cls.post = Post.objects.create(author=cls.user, text='текст',
+                                       group=cls.group)
+
+    def query_plan(self, queryset=None, sql=None, params=()):
+        if queryset is not None:
+            sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexedPlan(self, queryset):
+        plan = self.query_plan(queryset)
+        for step in plan:
+            self.assertNotIn('TEMP B-TREE', step, plan)
+            if step.startswith('SCAN'):
+                self.assertIn('INDEX', step, plan)
+
+    def test_view_queries_use_indexes(self):
+        """Запросы представлений используют составные индексы"""
+        now = timezone.now()
+        keyset = CursorPaginator(Post.objects.all(), 10)._after(
+            now - dt.timedelta(days=1), self.post.id, 'lt')
+        queries = {
+            'index': Post.objects.all()[:10],
+            'index_cursor': Post.objects.filter(keyset)[:10],
+            'group_list': self.group.posts.all()[:10],
+            'group_cursor': self.group.posts.filter(keyset)[:10],
+            'profile': self.user.posts.all()[:10],
+            'profile_cursor': self.user.posts.filter(keyset)[:10],
+            'post_comments': self.post.comments.all(),
+            'follow_index': FeedEntry.objects.filter(
+                user=self.user).order_by('-pub_date', '-post_id')[:10],
+            'followers': Follow.objects.filter(
+                author=self.user).values_list('user_id', flat=True),
+            'following': Follow.objects.filter(
+                user=self.user).values_list('author_id', flat=True),
+            'comments': Comment.objects.filter(post=self.post)[:10],
+            'admin_posts_day': Post.objects.filter(
+                pub_date__gte=now - dt.timedelta(days=1),
+                pub_date__lt=now)[:100],
+            'admin_comments': Comment.objects.order_by(
+                '-created', '-id')[:100],
+            'group_index': Group.objects.select_related(
+                'last_post_author')[:50],
+            'tag': tags.tagged(PostTag.TAG, 'тег')[:10],
+            'group_last_post': Post.objects.filter(
+                group=self.group).order_by('-pub_date', '-id')[:1],
+            'duplicate_candidates': PostBand.objects.filter(
+                key__in=[1, 2]).values_list(
+                'post_id', 'post__signature', 'post__duplicate_of'),
+        }
+        for name, queryset in queries.items():
+            with self.subTest(query=name):
+                self.assertIndexedPlan(queryset)
+
+    def test_admin_date_hierarchy_reads_bounds(self):
+        """Годы и месяцы date_hierarchy - поиском границ по индексу, без
+        просмотра всех записей"""
+        request = RequestFactory().get('/admin/posts/post/')
+        queryset = site._registry[Post].get_queryset(request)
+        year = timezone.localtime(self.post.pub_date).year
+        with CaptureQueriesContext(connection) as context:
+            years = queryset.dates('pub_date', 'year')
+            months = queryset.filter(pub_date__year=year).dates(
+                'pub_date', 'month')
+            bounds = queryset.aggregate(first=Min('pub_date'),
+                                        last=Max('pub_date'))
+        self.assertEqual(years, [dt.date(year, 1, 1)])
+        self.assertEqual(len(months), 1)
+        self.assertEqual(bounds['first'], self.post.pub_date)
+        for query in context.captured_queries:
+            plan = self.query_plan(sql=query['sql'])
+            with self.subTest(sql=query['sql']):
+                self.assertTrue(
+                    all(step.startswith('SEARCH') for step in plan), plan)
@@ -0,0 +1,83 @@
+from io import StringIO
+
+from django.contrib.admin.sites import site
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from .. import search
+from ..models import Post, User
+from ..search import FTS_TABLE
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth',
+                                            is_staff=True,
+                                            is_superuser=True)
+        cls.rare = Post.objects.create(
+            author=cls.user, text='котики и собаки')
+        cls.often = Post.objects.create(
+            author=cls.user, text='котики, котики и ещё раз котики')
+        cls.other = Post.objects.create(author=cls.user, text='про погоду')
+
+    def ids(self, query):
+        return list(search.search(query).values_list('id', flat=True))
+
+    def test_ranked_by_relevance(self):
+        """Найденные записи упорядочены по рангу bm25"""
+        self.assertEqual(self.ids('котики'), [self.often.id, self.rare.id])
+
+    def test_prefix_and_all_terms(self):
+        """Слова ищутся как префиксы, нужны все слова запроса"""
+        self.assertEqual(self.ids('кот соб'), [self.rare.id])
+        self.assertEqual(self.ids('ПОГОД'), [self.other.id])
+        self.assertEqual(self.ids('"OR: NEAR('), [])
+        self.assertEqual(self.ids(''), [])
+
+    def test_index_follows_update_and_delete(self):
+        """Триггеры обновляют индекс при изменении и удалении записей"""
+        Post.objects.filter(id=self.other.id).update(text='про котиков')
+        self.assertIn(self.other.id, self.ids('котик'))
+        self.assertEqual(self.ids('погода'), [])
+        Post.objects.filter(id=self.rare.id).delete()
+        self.assertEqual(self.ids('собаки'), [])
+
+    def test_view_pages_by_cursor(self):
+        """Страница поиска листается курсором и сохраняет запрос"""
+        for number in range(12):
+            Post.objects.create(author=self.user, text=f'котики {number}')
+        response = Client().get(reverse('posts:search'), {'q': 'котики'})
+        first = response.context['page_obj']
+        self.assertEqual(first[0].id, self.often.id)
+        self.assertContains(response, 'q=%D0%BA%D0%BE%D1%82%D0%B8%D0%BA%D0%B8'
+                                      '&amp;cursor=')
+        second = Client().get(reverse('posts:search'), {
+            'q': 'котики', 'cursor': first.next_cursor,
+        }).context['page_obj']
+        seen = [post.id for post in first] + [post.id for post in second]
+        self.assertEqual(len(seen), 14)
+        self.assertEqual(len(set(seen)), 14)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по FTS-индексу"""
+        request = RequestFactory().get('/admin/posts/post/')
+        request.user = self.user
+        admin = site._registry[Post]
+        queryset, _ = admin.get_search_results(
+            request, Post.objects.all(), 'собаки')
+        self.assertIn(FTS_TABLE, str(queryset.query))
+        self.assertEqual(list(queryset), [self.rare])
+
+    def test_rebuild_command(self):
+        """Команда rebuild_search_index восстанавливает индекс"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('delete-all')")
+        self.assertEqual(self.ids('погоду'), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(self.ids('погоду'), [self.other.id])
@@ -0,0 +1,80 @@
+from io import StringIO
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import suggestions
+from ..follow_graph import FollowGraph
+from ..models import Follow, User
+
+
+class FollowGraphTests(TestCase):
+
+    def suggest(self, edges, user_id):
+        graph = FollowGraph(np.array(edges, dtype=np.int64))
+        return graph.suggest_all().get(user_id, [])
+
+    def test_friends_of_friends(self):
+        """Авторов, которых читают авторы пользователя, - в список"""
+        self.assertEqual(self.suggest([(1, 2), (2, 3)], 1), [3])
+
+    def test_cofollow(self):
+        """Подписки похожих читателей - в список, самые похожие выше"""
+        edges = [(1, 10), (1, 11),
+                 (2, 10), (2, 11), (2, 20),
+                 (3, 10), (3, 30)]
+        self.assertEqual(self.suggest(edges, 1), [20, 30])
+
+    def test_followed_and_self_excluded(self):
+        """Уже прочитанные авторы и сам пользователь не предлагаются"""
+        edges = [(1, 2), (1, 3), (2, 3), (2, 1), (3, 4)]
+        self.assertEqual(self.suggest(edges, 1), [4])
+
+    def test_popular(self):
+        """Без подписок - самые читаемые авторы"""
+        graph = FollowGraph(np.array([(1, 5), (2, 5), (3, 6)]))
+        self.assertEqual(graph.popular(2), [5, 6])
+
+
+class SuggestionsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader, cls.author, cls.other, cls.friend = [
+            User.objects.create_user(username=name)
+            for name in ('reader', 'author', 'other', 'friend')]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.author, author=cls.other)
+        Follow.objects.create(user=cls.friend, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        call_command('build_suggestions', stdout=StringIO())
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_served_from_cache(self):
+        """Подсказки на страницах берутся из кэша"""
+        self.assertEqual(suggestions.for_user(self.reader),
+                         [(self.other.id, 'other')])
+        for url in (reverse('posts:follow_index'),
+                    reverse('posts:profile', args=['author'])):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.context['suggestions'],
+                                 [(self.other.id, 'other')])
+                self.assertContains(response, 'Кого почитать')
+
+    def test_popular_for_new_users(self):
+        """Пользователь без подписок видит популярных авторов"""
+        self.assertEqual(suggestions.for_user(self.other),
+                         [(self.author.id, 'author')])
+
+    def test_follow_removes_suggestion(self):
+        """Подписка сразу убирает автора из подсказок"""
+        self.client.get(reverse('posts:profile_follow', args=['other']))
+        self.assertEqual(suggestions.for_user(self.reader), [])
@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import tags
+from ..models import Post, PostTag, User
+from ..settings import POST_COUNT
+
+
+class TagsTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def index(self, post):
+        return set(PostTag.objects.filter(post=post).values_list(
+            'kind', 'name'))
+
+    def test_extract(self):
+        """Теги в нижнем регистре, упоминания без точки в конце,
+        почта и HTML-сущности - не теги"""
+        self.assertEqual(
+            tags.extract('#Django и #джанго, @reader. a@b.ru &#39; #django'),
+            [('tag', 'django'), ('tag', 'джанго'), ('mention', 'reader')])
+
+    def test_overlong_names_skipped(self):
+        """Слово длиннее имени в индексе - не тег и не упоминание"""
+        long_name = 'a' * (tags.NAME_MAX_LENGTH + 1)
+        self.assertEqual(
+            tags.extract(f'#{long_name} @{long_name} @{long_name[1:]}.'),
+            [('mention', long_name[1:])])
+
+    def test_indexed_on_create_and_edit(self):
+        """Форма записи обновляет индекс при создании и правке"""
+        self.client.post(reverse('posts:post_create'), data={
+            'text': '#Первый пост для @reader и @nobody'})
+        post = Post.objects.get()
+        self.assertEqual(self.index(post),
+                         {('tag', 'первый'), ('mention', 'reader')})
+        self.client.post(reverse('posts:post_edit', args=[post.id]), data={
+            'text': 'теперь #второй'})
+        self.assertEqual(self.index(post), {('tag', 'второй')})
+
+    def test_tag_page_keyset(self):
+        """Страница тега листается курсором"""
+        for number in range(POST_COUNT + 2):
+            self.client.post(reverse('posts:post_create'), data={
+                'text': f'запись {number} #Тег'})
+        Post.objects.create(author=self.author, text='без тега')
+        url = reverse('posts:tag', args=['ТЕГ'])
+        first = self.client.get(url).context['page_obj']
+        self.assertEqual(len(first), POST_COUNT)
+        self.assertEqual(first[0], Post.objects.filter(
+            text__contains='#Тег').first())
+        second = self.client.get(
+            url, {'cursor': first.next_cursor}).context['page_obj']
+        self.assertEqual(len(second), 2)
+        self.assertFalse(second.has_next())
+
+    def test_mentions_page_and_links(self):
+        """Упоминания пользователя и ссылки из текста записи"""
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'привет, @reader! #тег'})
+        post = Post.objects.get()
+        response = self.client.get(reverse('posts:mentions',
+                                           args=['reader']))
+        self.assertEqual(list(response.context['page_obj']), [post])
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.id]))
+        self.assertContains(response, '<a href="{}">@reader</a>'.format(
+            reverse('posts:profile', args=['reader'])))
+        self.assertContains(response, '<a href="{}">#тег</a>'.format(
+            reverse('posts:tag', args=['тег'])))
+
+    def test_unknown_mentions_not_linked(self):
+        """Упоминание несуществующего пользователя остаётся текстом"""
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'привет, @reader и @nobody'})
+        post = Post.objects.get()
+        for url in (reverse('posts:post_detail', args=[post.id]),
+                    reverse('posts:home_page')):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, '<a href="{}">@reader</a>'
+                                    .format(reverse('posts:profile',
+                                                    args=['reader'])))
+                self.assertNotContains(
+                    response, reverse('posts:profile', args=['nobody']))
+
+    def test_backfill_command(self):
+        """Команда заполняет индекс для записей, сохранённых в обход
+        формы"""
+        posts = [Post.objects.create(author=self.author,
+                                     text=f'#старый {number} @auth')
+                 for number in range(5)]
+        call_command('index_post_tags', chunk_size=2, stdout=StringIO())
+        for post in posts:
+            self.assertEqual(self.index(post),
+                             {('tag', 'старый'), ('mention', 'auth')})
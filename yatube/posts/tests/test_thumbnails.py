@@ -0,0 +1,162 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import images, thumbnails
+from ..models import Post, User
+from ..settings import CARD_THUMBNAIL, CARD_WIDTHS, IMAGE_MAX_WIDTH
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION_TAG = 0x0112
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def uploaded(name):
+    # Хранилище по содержимому: разным именам - разное содержимое
+    return SimpleUploadedFile(name=name, content=SMALL_GIF + name.encode(),
+                              content_type='image/gif')
+
+
+def run_on_commit(callback):
+    callback()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('posts.thumbnails._executor', None)
+@mock.patch('posts.thumbnails.transaction.on_commit', run_on_commit)
+class ThumbnailTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_generated_on_create(self):
+        """Миниатюры строятся при создании записи, а не в ленте"""
+        self.client.post(reverse('posts:post_create'), data={
+            'text': 'с картинкой', 'image': uploaded('create.gif')})
+        post = Post.objects.get(text='с картинкой')
+        self.assertIsNotNone(thumbnails.lookup(post.image, *CARD_THUMBNAIL))
+
+    def test_placeholder_until_ready(self):
+        """Пока миниатюры нет, лента показывает заглушку и ставит её
+        в очередь"""
+        # Запись из тех времён, когда миниатюры не строились заранее
+        with mock.patch('posts.thumbnails.schedule'):
+            post = Post.objects.create(author=self.user, text='запись',
+                                       image=uploaded('legacy.gif'))
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            response = self.client.get(reverse('posts:home_page'))
+        schedule.assert_called_once_with(post)
+        self.assertContains(response, 'Картинка готовится')
+        thumbnails.generate(post)
+        response = self.client.get(reverse('posts:home_page'))
+        self.assertNotContains(response, 'Картинка готовится')
+        self.assertContains(response, '<img class="card-img my-2"')
+
+    def test_rolled_back_schedule_not_pending(self):
+        """Откат транзакции не оставляет картинку в очереди навсегда"""
+        with mock.patch('posts.thumbnails.schedule'):
+            post = Post.objects.create(author=self.user, text='запись',
+                                       image=uploaded('rollback.gif'))
+        # Транзакция откатилась: колбэк после коммита не вызван
+        with mock.patch('posts.thumbnails.transaction.on_commit'):
+            thumbnails.schedule(post)
+        self.assertNotIn(post.image.name, thumbnails._pending)
+        with mock.patch('posts.thumbnails._run') as run:
+            thumbnails.schedule(post)
+        run.assert_called_once_with(post)
+        thumbnails._pending.discard(post.image.name)
+
+    def test_old_thumbnails_invalidated_on_edit(self):
+        """Замена картинки удаляет миниатюры старой и строит новые"""
+        post = Post.objects.create(author=self.user, text='запись',
+                                   image=uploaded('old.gif'))
+        thumbnails.generate(post)
+        old_image = post.image.name
+        self.client.post(reverse('posts:post_edit', args=[post.id]), data={
+            'text': 'запись', 'image': uploaded('new.gif')})
+        post.refresh_from_db()
+        self.assertIsNone(thumbnails.lookup(old_image, *CARD_THUMBNAIL))
+        self.assertIsNotNone(thumbnails.lookup(post.image, *CARD_THUMBNAIL))
+
+    def test_page_thumbnails_looked_up_in_one_query(self):
+        """Миниатюры страницы ищутся разом, а не по одной на запись"""
+        posts = [Post.objects.create(author=self.user, text=f'запись {n}',
+                                     image=uploaded(f'page{n}.gif'))
+                 for n in range(3)]
+        for post in posts:
+            thumbnails.generate(post)
+        cache.clear()
+        images = [post.image for post in posts]
+        with self.assertNumQueries(1):
+            found = thumbnails.lookup_many(images)
+        self.assertEqual(set(found), {image.name for image in images})
+        with self.assertNumQueries(0):
+            thumbnails.lookup_many(images)
+
+    def test_responsive_picture(self):
+        """Лента отдаёт WebP и JPEG нескольких ширин с ленивой загрузкой"""
+        post = Post.objects.create(author=self.user, text='запись',
+                                   image=uploaded('picture.gif'))
+        thumbnails.generate(post)
+        response = self.client.get(reverse('posts:home_page'))
+        self.assertContains(response, '<source type="image/webp"')
+        self.assertContains(response, 'loading="lazy"')
+        for width in CARD_WIDTHS:
+            self.assertContains(response, f' {width}w', count=2)
+
+
+class UploadNormalizeTests(TestCase):
+
+    @staticmethod
+    def jpeg(size, orientation=None):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        if orientation:
+            exif[ORIENTATION_TAG] = orientation
+        Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(),
+                                  content_type='image/jpeg')
+
+    def test_exif_orientation_applied_and_stripped(self):
+        """Картинка повёрнута по EXIF, метаданные удалены"""
+        with Image.open(images.normalize(self.jpeg((40, 20), 6))) as image:
+            self.assertEqual(image.size, (20, 40))
+            self.assertFalse(image.getexif())
+
+    def test_wide_original_downscaled(self):
+        """Исходник шире IMAGE_MAX_WIDTH уменьшается при загрузке"""
+        upload = self.jpeg((IMAGE_MAX_WIDTH + 100, 20))
+        with Image.open(images.normalize(upload)) as image:
+            self.assertEqual(image.width, IMAGE_MAX_WIDTH)
+
+    def test_plain_upload_unchanged(self):
+        """Картинку без EXIF обычного размера не пересохраняем"""
+        upload = self.jpeg((40, 20))
+        self.assertIs(images.normalize(upload), upload)
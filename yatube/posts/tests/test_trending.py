@@ -0,0 +1,100 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import trending
+from ..models import Comment, Post, TrendingPost, User
+from ..settings import TRENDING_HALF_LIFE, TRENDING_WINDOW
+
+
+class TrendingTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.now = timezone.now()
+
+    def setUp(self):
+        cache.clear()
+
+    def post(self, age=0):
+        post = Post.objects.create(author=self.user, text='запись')
+        post.pub_date = self.now - timedelta(seconds=age)
+        Post.objects.filter(pk=post.pk).update(pub_date=post.pub_date)
+        return post
+
+    def comment(self, post, age=0):
+        comment = Comment.objects.create(post=post, author=self.user,
+                                         text='комментарий')
+        comment.created = self.now - timedelta(seconds=age)
+        Comment.objects.filter(pk=comment.pk).update(created=comment.created)
+        trending.record_comment(comment)
+        return comment
+
+    def test_ranked_by_comment_velocity(self):
+        """Больше свежих комментариев - выше в списке"""
+        quiet, busy = self.post(), self.post()
+        self.comment(quiet)
+        for _ in range(3):
+            self.comment(busy)
+        self.assertEqual(trending.ranked_ids(), [busy.id, quiet.id])
+
+    def test_old_comments_decay(self):
+        """Старые комментарии весят меньше новых"""
+        stale = self.post(age=TRENDING_HALF_LIFE * 8)
+        for _ in range(5):
+            self.comment(stale, age=TRENDING_HALF_LIFE * 8)
+        fresh = self.post()
+        for _ in range(2):
+            self.comment(fresh)
+        self.assertEqual(trending.ranked_ids(), [fresh.id, stale.id])
+
+    def test_posts_outside_window_skipped(self):
+        """Записи старше окна не попадают в рейтинг"""
+        old = self.post(age=TRENDING_WINDOW + 60)
+        self.comment(old)
+        self.assertFalse(TrendingPost.objects.filter(post=old).exists())
+
+    def test_add_comment_feeds_page(self):
+        """Комментарий через форму поднимает запись на странице
+        «Популярное», а страница не агрегирует комментарии"""
+        post = self.post()
+        client = Client()
+        client.force_login(self.user)
+        client.post(reverse('posts:add_comment', args=[post.id]),
+                    data={'text': 'комментарий'})
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('posts:trending'))
+        self.assertEqual(list(response.context['page_obj']), [post])
+        for query in queries:
+            self.assertNotIn('posts_comment', query['sql'])
+
+    def test_rebuild_matches_incremental(self):
+        """Команда с --rebuild считает то же, что и обновления"""
+        posts = [self.post(age=3600 * number) for number in range(3)]
+        for number, post in enumerate(posts):
+            for age in range(number + 1):
+                self.comment(post, age=age * 600)
+        scores = dict(TrendingPost.objects.values_list('post_id', 'score'))
+        call_command('rank_trending', rebuild=True, stdout=StringIO())
+        for post_id, score in TrendingPost.objects.values_list(
+                'post_id', 'score'):
+            self.assertAlmostEqual(score, scores[post_id])
+
+    def test_prune(self):
+        """Периодическая команда убирает записи, вышедшие из окна"""
+        post = self.post()
+        self.comment(post)
+        TrendingPost.objects.filter(post=post).update(
+            pub_date=self.now - timedelta(seconds=TRENDING_WINDOW + 60))
+        call_command('rank_trending', stdout=StringIO())
+        self.assertEqual(trending.ranked_ids(), [])
+        self.assertFalse(TrendingPost.objects.exists())
@@ -0,0 +1,105 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template.defaultfilters import filesizeformat
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..forms import PostForm
+from ..models import Post, User
+from ..uploads import BoundedImageUploadHandler
+from ..validators import TOO_LARGE, too_many_pixels
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def png(size):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def receive(content, chunk_size=64):
+    handler = BoundedImageUploadHandler()
+    handler.new_file('image', 'image.png', 'image/png', len(content))
+    written = 0
+    for start in range(0, len(content), chunk_size):
+        if handler.receive_data_chunk(
+                content[start:start + chunk_size], start) is not None:
+            written += 1
+    return handler.file_complete(len(content)), written
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BoundedUploadTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_handler_streams_allowed_upload(self):
+        """Допустимая загрузка целиком пишется во временный файл"""
+        content = png((20, 20))
+        upload, _ = receive(content)
+        self.assertIsNone(getattr(upload, 'rejected', None))
+        self.assertEqual(upload.read(), content)
+
+    @mock.patch('posts.uploads.IMAGE_MAX_BYTES', 100)
+    def test_handler_stops_at_byte_limit(self):
+        """Файл больше предела обрывается на первом лишнем куске"""
+        upload, _ = receive(b'x' * 1000)
+        self.assertEqual(upload.rejected,
+                         TOO_LARGE.format(filesizeformat(100)))
+        self.assertEqual(upload.size, 0)
+
+    @mock.patch('posts.uploads.IMAGE_MAX_PIXELS', 100)
+    def test_handler_rejects_by_header(self):
+        """Пиксели считаются по заголовку: остальное уже не читается"""
+        upload, written = receive(png((200, 200)))
+        self.assertEqual(upload.rejected, too_many_pixels(100))
+        self.assertEqual(written, 0)
+
+    @mock.patch('posts.validators.IMAGE_MAX_PIXELS', 100)
+    @mock.patch('posts.uploads.IMAGE_MAX_PIXELS', 100)
+    def test_form_shows_rejection(self):
+        """Отброшенная загрузка - ошибка формы, запись не создаётся"""
+        response = self.client.post(reverse('posts:post_create'), data={
+            'text': 'бомба',
+            'image': SimpleUploadedFile('bomb.png', png((200, 200)),
+                                        content_type='image/png')})
+        self.assertFormError(response, 'form', 'image',
+                             too_many_pixels(100))
+        self.assertFalse(Post.objects.filter(text='бомба').exists())
+
+    @mock.patch('posts.validators.IMAGE_MAX_PIXELS', 100)
+    def test_validator_checks_header(self):
+        """Форма проверяет пиксели и без обработчика загрузок"""
+        upload = SimpleUploadedFile('bomb.png', png((200, 200)),
+                                    content_type='image/png')
+        form = PostForm(data={'text': 'бомба'}, files={'image': upload})
+        self.assertFalse(form.is_valid())
+        self.assertIn(too_many_pixels(100), form.errors['image'])
+
+    def test_pixel_limit_in_message(self):
+        """В тексте ошибки точный предел, а не округлённые мегапиксели"""
+        for limit, message in (
+                (100, 'Картинка больше 100 пикселей.'),
+                (1, 'Картинка больше 1 пикселя.'),
+                (40 * 10 ** 6, 'Картинка больше 40\xa0000\xa0000 пикселей.')):
+            with self.subTest(limit=limit):
+                self.assertEqual(too_many_pixels(limit), message)
@@ -1,13 +1,17 @@
 import shutil
 import tempfile
 
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from django.conf import settings
 
 from ..models import Post, Group, User, Comment, Follow
 from ..settings import POST_COUNT
+from ..utils import NEXT, encode_cursor
 
 USERNAMES = ['auth', 'follower', 'unfollower']
 SLUGS = ['test-slug1', 'test-slug2']
@@ -88,6 +92,7 @@ class PostsPagesTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.client = Client()
         self.follower = Client()
         self.unfollower = Client()
@@ -241,3 +246,83 @@ class PostsPagesTests(TestCase):
             user=self.user_lists[1],
             author=self.user_lists[0]).exists()
         )
+
+    def test_cursor_pages_contains_records(self):
+        """Курсорная пагинация проходит ленту вперёд и назад"""
+        number_of_posts = {
+            HOME_PAGE_URL: self.OBJ_COUNT,
+            GROUP1_URL: self.OBJ_COUNT - 1,
+            USER1_URL: self.OBJ_COUNT,
+        }
+        for url, quantity in number_of_posts.items():
+            with self.subTest(url=url):
+                first_page = self.client.get(url + '?cursor=').context[
+                    'page_obj']
+                self.assertEqual(len(first_page), POST_COUNT)
+                self.assertFalse(first_page.has_previous())
+                second_page = self.client.get(
+                    url + f'?cursor={first_page.next_cursor}'
+                ).context['page_obj']
+                self.assertFalse(second_page.has_next())
+                post_ids = ([post.id for post in first_page]
+                            + [post.id for post in second_page])
+                self.assertEqual(len(set(post_ids)), quantity)
+                back_page = self.client.get(
+                    url + f'?cursor={second_page.previous_cursor}'
+                ).context['page_obj']
+                self.assertEqual(list(back_page), list(first_page))
+
+    def test_cursor_with_wrong_key_type_gives_first_page(self):
+        """Курсор с числом вместо даты - первая страница, а не ошибка"""
+        first_page = self.client.get(HOME_PAGE_URL + '?cursor=').context[
+            'page_obj']
+        for key in (1.5, float('nan')):
+            with self.subTest(key=key):
+                response = self.client.get(
+                    HOME_PAGE_URL + f'?cursor={encode_cursor(NEXT, key, 3)}')
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['page_obj']),
+                                 list(first_page))
+
+    def test_detail_queries_do_not_grow_with_comments(self):
+        """Число запросов страницы записи не зависит от комментариев"""
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.POST_SECOND_GROUP_URL)
+        for i in range(5):
+            Comment.objects.create(post=self.post_second_group,
+                                   author=self.user_lists[i % 3],
+                                   text=f'комментарий {i}')
+        cache.clear()
+        with self.assertNumQueries(len(context)):
+            self.client.get(self.POST_SECOND_GROUP_URL)
+
+
+class ListingQueriesTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username=USERNAMES[0])
+        cls.follower = User.objects.create_user(username=USERNAMES[1])
+        group = Group.objects.create(slug=SLUGS[0])
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        for i in range(POST_COUNT + 2):
+            Post.objects.create(author=cls.author, group=group,
+                                text=f'текст поста {i}')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.follower)
+
+    def test_listing_queries_do_not_grow_with_page_size(self):
+        """Число запросов ленты не зависит от числа записей на странице"""
+        for url in (HOME_PAGE_URL, GROUP1_URL, USER1_URL,
+                    SELECTED_POSTS_URL):
+            with self.subTest(url=url):
+                queries = []
+                for page in ('?page=1', '?page=2'):
+                    cache.clear()
+                    with CaptureQueriesContext(connection) as context:
+                        self.client.get(url + page)
+                    queries.append(len(context))
+                self.assertEqual(queries[0], queries[1])
@@ -0,0 +1,27 @@
+from urllib.parse import urlsplit
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+
+class QueryBudgetMixin:
+    """Проверка лимитов запросов, объявленных через query_budget."""
+
+    def assertWithinQueryBudget(self, client, url, method='get',
+                                data=None, cold_cache=True):
+        budget = getattr(resolve(urlsplit(url).path).func,
+                         'query_budget', None)
+        self.assertIsNotNone(budget, f'{url}: не объявлен query_budget')
+        if cold_cache:
+            cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            getattr(client, method)(url, data)
+        self.assertLessEqual(
+            len(context), budget,
+            f'{method.upper()} {url}: {len(context)} запросов при лимите '
+            f'{budget}:\n' + '\n'.join(
+                query['sql'] for query in context.captured_queries)
+        )
+        return len(context)
@@ -0,0 +1,194 @@
+"""Миниатюры картинок записей готовятся в фоне, а не в запросе.
+
+После сохранения записи с новой картинкой все геометрии из
+THUMBNAIL_GEOMETRIES строятся после коммита - в пуле из
+THUMBNAIL_WORKERS потоков или, если он пуст, сразу. Шаблоны только ищут
+готовую миниатюру (lookup) и до её появления показывают заглушку;
+когда миниатюра готова, поколения записи сдвигаются, и фрагменты
+с заглушкой собираются заново.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (EMPTY_VALUE,
+                                                       KVStore)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.middleware import outside_query_budget
+
+from . import generations
+from .models import Post
+from .settings import (CARD_FORMATS, CARD_SIZES, CARD_THUMBNAIL,
+                       THUMBNAIL_GEOMETRIES, THUMBNAIL_WORKERS)
+
+logger = logging.getLogger(__name__)
+
+_executor = (ThreadPoolExecutor(THUMBNAIL_WORKERS,
+                                thread_name_prefix='thumbnails')
+             if THUMBNAIL_WORKERS else None)
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _image_storage():
+    return Post._meta.get_field('image').storage
+
+
+def thumbnail_name(image, geometry, options):
+    """Имя файла миниатюры - так же, как его строит sorl-thumbnail."""
+    backend = default.backend
+    # Ключ миниатюры зависит и от хранилища исходника
+    source = ImageFile(getattr(image, 'name', image), _image_storage())
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return backend._get_thumbnail_filename(source, geometry, options)
+
+
+def lookup(image, geometry, options):
+    """Готовая миниатюра или None; сама миниатюру не строит."""
+    name = getattr(image, 'name', image)
+    found = lookup_many([name], [(geometry, options)])
+    return found[name][0] if name in found else None
+
+
+def _get_many_raw(kvstore, keys):
+    # Как KVStore._get_raw, но одним get_many и одним запросом к базе
+    if not isinstance(kvstore, KVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    if not keys:
+        return {}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        stored = dict(KVStoreModel.objects.filter(
+            key__in=missing).values_list('key', 'value'))
+        found = {key: stored.get(key, EMPTY_VALUE) for key in missing}
+        kvstore.cache.set_many(found,
+                               thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(found)
+    return {key: value for key, value in values.items()
+            if value and value != EMPTY_VALUE}
+
+
+def lookup_many(images, geometries=THUMBNAIL_GEOMETRIES):
+    """Готовые миниатюры страницы разом.
+
+    {имя картинки: [миниатюра каждой геометрии]} - только для картинок,
+    у которых готовы все геометрии.
+    """
+    names = {getattr(image, 'name', image) for image in images} - {''}
+    keys = {
+        (name, index): add_prefix(ImageFile(
+            thumbnail_name(name, geometry, options), default.storage).key)
+        for name in names
+        for index, (geometry, options) in enumerate(geometries)}
+    values = _get_many_raw(default.kvstore, list(keys.values()))
+    found = {}
+    for name in names:
+        raw = [values.get(keys[name, index])
+               for index in range(len(geometries))]
+        if all(raw):
+            found[name] = [deserialize_image_file(value) for value in raw]
+    return found
+
+
+def pictures(images):
+    """{имя картинки: {'src', 'sizes', 'webp', 'jpeg'}} для <picture>."""
+    result = {}
+    for name, found in lookup_many(images).items():
+        srcsets = {image_format: [] for image_format in CARD_FORMATS}
+        picture = {'sizes': CARD_SIZES}
+        for (geometry, options), thumbnail in zip(THUMBNAIL_GEOMETRIES,
+                                                  found):
+            srcsets[options['format']].append(
+                f'{thumbnail.url} {thumbnail.width}w')
+            if (geometry, options) == CARD_THUMBNAIL:
+                picture['src'] = thumbnail.url
+        for image_format, srcset in srcsets.items():
+            picture[image_format.lower()] = ', '.join(srcset)
+        result[name] = picture
+    return result
+
+
+def generate(post):
+    """Строит все миниатюры записи и сбрасывает фрагменты с заглушкой."""
+    for geometry, options in THUMBNAIL_GEOMETRIES:
+        get_thumbnail(post.image, geometry, **options)
+    generations.bump(*generations.post_scopes(post))
+
+
+def _run(post):
+    try:
+        generate(post)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры %s', post.image)
+    finally:
+        with _pending_lock:
+            _pending.discard(post.image.name)
+        if _executor is not None:
+            connection.close()
+
+
+def _run_inline(post):
+    with outside_query_budget():
+        _run(post)
+
+
+def schedule(post):
+    """Ставит миниатюры записи в очередь после коммита транзакции."""
+    if post.image.name:
+        transaction.on_commit(lambda: _submit(post))
+
+
+def _submit(post):
+    # Имя попадает в _pending только после коммита: при откате
+    # транзакции оно не застревает там навсегда
+    name = post.image.name
+    with _pending_lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    if _executor is None:
+        # Без пула миниатюры строятся в потоке запроса, но это та же
+        # фоновая работа: в лимит запросов представления она не входит
+        _run_inline(post)
+    else:
+        _executor.submit(_run, post)
+
+
+def _delete_thumbnails(name):
+    # Как KVStore.delete, но ключи читаются и удаляются разом, а не
+    # по запросу на каждую миниатюру
+    kvstore = default.kvstore
+    source = ImageFile(name, _image_storage())
+    if not isinstance(kvstore, KVStore):
+        kvstore.delete(source)
+        return
+    image_key = add_prefix(source.key)
+    list_key = add_prefix(source.key, identity='thumbnails')
+    stored = _get_many_raw(kvstore, [list_key]).get(list_key)
+    keys = [add_prefix(key) for key in deserialize(stored)] if stored else []
+    for value in _get_many_raw(kvstore, keys).values():
+        deserialize_image_file(value).delete()
+    kvstore._delete_raw(image_key, list_key, *keys)
+
+
+def invalidate(name):
+    """Удаляет миниатюры заменённой картинки; сам файл остаётся."""
+    if name:
+        transaction.on_commit(lambda: _delete_thumbnails(name))
@@ -0,0 +1,120 @@
+"""Популярные записи: рейтинг по свежим комментариям.
+
+Рейтинг обновляется при каждом комментарии одним UPDATE (forward decay):
+вес комментария - 2 ** (время / TRENDING_HALF_LIFE), а score записи -
+log2 суммы весов. Старые комментарии не нужно «остужать»: у новых вес
+больше во столько же раз, во сколько старые успели бы остыть, поэтому
+сравнивать score разных записей можно в любой момент. Упорядоченный
+список id лежит в кэше; страница «Популярное» только читает его.
+"""
+import math
+from datetime import datetime, timedelta
+
+from django.core.cache import cache
+from django.db.models import F, Value
+from django.db.models.functions import Log, Power
+from django.utils import timezone
+
+from .models import Comment, TrendingPost
+from .settings import (TRENDING_HALF_LIFE, TRENDING_LIMIT,
+                       TRENDING_POST_WEIGHT, TRENDING_TIMEOUT,
+                       TRENDING_WINDOW)
+
+TRENDING_KEY = 'trending'
+BATCH_SIZE = 500
+EPOCH = datetime(2021, 1, 1, tzinfo=timezone.utc)
+
+
+def _position(moment):
+    """log2 веса события в момент moment."""
+    return (moment - EPOCH).total_seconds() / TRENDING_HALF_LIFE
+
+
+def _add(first, second):
+    """log2(2 ** first + 2 ** second) без переполнения."""
+    return max(first, second) + math.log2(1 + 2 ** -abs(first - second))
+
+
+def _initial(pub_date):
+    return _position(pub_date) + math.log2(TRENDING_POST_WEIGHT)
+
+
+def _window_start(now=None):
+    return (now or timezone.now()) - timedelta(seconds=TRENDING_WINDOW)
+
+
+def record_comment(comment):
+    """Добавляет комментарий к рейтингу записи и, если запись может
+    попасть в список, пересобирает его."""
+    post = comment.post
+    if post.pub_date < _window_start(comment.created):
+        return
+    rows = TrendingPost.objects.filter(post_id=post.id)
+    position = _position(comment.created)
+    increment = {'score': F('score') + Log(
+        2, Value(1.0) + Power(2, Value(position) - F('score')))}
+    if not rows.update(**increment):
+        # Первый комментарий: строка с весом самой записи; если её
+        # успел создать параллельный запрос, INSERT пропускается
+        TrendingPost.objects.bulk_create([TrendingPost(
+            post_id=post.id, pub_date=post.pub_date,
+            score=_initial(post.pub_date))], ignore_conflicts=True)
+        rows.update(**increment)
+    ranked = cache.get(TRENDING_KEY)
+    if ranked is not None and post.id not in ranked['ids']:
+        score = rows.values_list('score', flat=True).first()
+        if score is None or score < ranked['cutoff']:
+            return
+    rank()
+
+
+def rank(now=None):
+    """Сохраняет в кэш первые TRENDING_LIMIT записей окна по рейтингу.
+
+    Чтение по индексу trending_score_idx с LIMIT, без агрегации.
+    """
+    rows = list(TrendingPost.objects.filter(
+        pub_date__gte=_window_start(now)
+    ).order_by('-score').values_list('post_id', 'score')[:TRENDING_LIMIT])
+    ranked = {
+        'ids': [post_id for post_id, _ in rows],
+        # Запись с рейтингом ниже последнего в полном списке в него
+        # не попадёт
+        'cutoff': (rows[-1][1] if len(rows) == TRENDING_LIMIT
+                   else -math.inf),
+    }
+    cache.set(TRENDING_KEY, ranked, TRENDING_TIMEOUT)
+    return ranked
+
+
+def ranked_ids():
+    """id популярных записей, от самой обсуждаемой."""
+    ranked = cache.get(TRENDING_KEY)
+    if ranked is None:
+        ranked = rank()
+    return ranked['ids']
+
+
+def prune(now=None):
+    """Удаляет рейтинги записей, которые вышли из окна."""
+    return TrendingPost.objects.filter(
+        pub_date__lt=_window_start(now)).delete()[0]
+
+
+def rebuild(now=None):
+    """Считает рейтинги заново по комментариям к записям окна."""
+    scores = {}
+    for post_id, pub_date, created in Comment.objects.filter(
+        post__pub_date__gte=_window_start(now)
+    ).order_by().values_list('post_id', 'post__pub_date',
+                             'created').iterator():
+        if post_id not in scores:
+            scores[post_id] = (pub_date, _initial(pub_date))
+        scores[post_id] = (pub_date,
+                           _add(scores[post_id][1], _position(created)))
+    TrendingPost.objects.all().delete()
+    TrendingPost.objects.bulk_create(
+        (TrendingPost(post_id=post_id, pub_date=pub_date, score=score)
+         for post_id, (pub_date, score) in scores.items()),
+        batch_size=BATCH_SIZE)
+    return len(scores)
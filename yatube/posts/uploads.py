@@ -0,0 +1,61 @@
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+from .settings import IMAGE_HEADER_BYTES, IMAGE_MAX_BYTES, IMAGE_MAX_PIXELS
+from .validators import TOO_LARGE, image_pixels, too_many_pixels
+
+
+class BoundedImageUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузку на диск по частям и бросает её, как только она
+    превысила IMAGE_MAX_BYTES или заголовок показал больше
+    IMAGE_MAX_PIXELS пикселей.
+
+    Отброшенный файл заменяется пустым с причиной в атрибуте rejected:
+    её показывает PostForm.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.head = b''
+        self.rejected = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.rejected:
+            return None
+        if start + len(raw_data) > IMAGE_MAX_BYTES:
+            return self.reject(TOO_LARGE.format(
+                filesizeformat(IMAGE_MAX_BYTES)))
+        if self.head is not None:
+            self.check_header(raw_data)
+            if self.rejected:
+                return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def check_header(self, raw_data):
+        self.head += raw_data
+        try:
+            pixels = image_pixels(BytesIO(self.head))
+        except Image.DecompressionBombError:
+            pixels = IMAGE_MAX_PIXELS + 1
+        if pixels is not None and pixels > IMAGE_MAX_PIXELS:
+            self.reject(too_many_pixels(IMAGE_MAX_PIXELS))
+        elif pixels is not None or len(self.head) >= IMAGE_HEADER_BYTES:
+            # Заголовок прочитан (или это не картинка - решит форма)
+            self.head = None
+
+    def reject(self, reason):
+        self.rejected = reason
+        self.head = None
+        # TemporaryUploadedFile удаляет файл при закрытии
+        self.file.close()
+
+    def file_complete(self, file_size):
+        if not self.rejected:
+            return super().file_complete(file_size)
+        upload = SimpleUploadedFile(self.file_name, b'', self.content_type)
+        upload.rejected = self.rejected
+        return upload
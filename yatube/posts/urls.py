@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -10,10 +10,21 @@ urlpatterns = [
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('posts/<post_id>/edit/', views.post_edit, name='post_edit'),
     path('create/', views.post_create, name='post_create'),
+    path('group/', views.group_index, name='group_index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('tag/<str:name>/', views.tag_posts, name='tag'),
+    path('profile/<str:username>/mentions/', views.mentions,
+         name='mentions'),
+    path('trending/', views.trending_posts, name='trending'),
+    path('search/', views.search_posts, name='search'),
+    path('api/v1/posts/', api.index, name='api_index'),
+    path('api/v1/group/<slug:slug>/', api.group_posts, name='api_group'),
+    path('api/v1/profile/<str:username>/', api.profile,
+         name='api_profile'),
+    path('api/v1/posts/<int:post_id>/', api.post_detail, name='api_post'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
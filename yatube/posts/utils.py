@@ -1,9 +1,225 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import math
+from datetime import datetime
 
-from .settings import POST_COUNT
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Max, Min, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
+from .settings import (COUNT_EXACT_LIMIT, COUNT_TIMEOUT, PAGE_WINDOW,
+                       POST_COUNT)
 
-def paginator_page(request, post_list):
-    paginator = Paginator(post_list, POST_COUNT)
+NEXT = 'n'
+PREVIOUS = 'p'
+
+
+def encode_cursor(direction, key, row_id):
+    """Курсор - направление и ключ записи: (дата или ранг, id)."""
+    key = key.isoformat() if hasattr(key, 'isoformat') else repr(float(key))
+    raw = f'{direction}{key}|{row_id}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, ключ, id) или None."""
+    try:
+        raw = base64.urlsafe_b64decode(
+            cursor + '=' * (-len(cursor) % 4)).decode()
+        key, row_id = raw[1:].split('|')
+        parsed = parse_datetime(key)
+        key = float(key) if parsed is None else parsed
+        row_id = int(row_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if isinstance(key, float) and not math.isfinite(key):
+        return None
+    if raw[0] not in (NEXT, PREVIOUS):
+        return None
+    return raw[0], key, row_id
+
+
+class CursorPage(Page):
+    """Страница без номера: ссылки на соседей задаются курсорами."""
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return (f'<Page previous={self.previous_cursor} '
+                f'next={self.next_cursor}>')
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (pub_date, id).
+
+    Не выполняет COUNT(*) и OFFSET: каждая страница - один запрос
+    по индексу, сколько бы страниц ни было до неё. key_fields - пара
+    полей (дата или ранг, id записи) для сортировки по убыванию
+    и курсора, например ('pub_date', 'post_id') для записей ленты
+    подписок или ('score', 'id') для поиска. key_type - тип первого
+    ключа (datetime или float): курсор с ключом другого типа считается
+    испорченным.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page,
+                 key_fields=('pub_date', 'id'), key_type=datetime,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.key_fields = key_fields
+        self.key_type = key_type
+
+    def get_page(self, cursor):
+        key = decode_cursor(cursor) if cursor else None
+        if key is not None and not isinstance(key[1], self.key_type):
+            key = None
+        if key is None:
+            return self._build_page(
+                list(self._ordered(descending=True)[:self.per_page + 1]),
+                has_previous=False)
+        direction, pub_date, post_id = key
+        if direction == NEXT:
+            rows = list(self._ordered(descending=True).filter(
+                self._after(pub_date, post_id, 'lt')
+            )[:self.per_page + 1])
+            return self._build_page(rows, has_previous=True)
+        rows = list(self._ordered(descending=False).filter(
+            self._after(pub_date, post_id, 'gt')
+        )[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        return self._build_page(rows, has_previous=has_previous,
+                                has_next=True)
+
+    def _after(self, pub_date, post_id, lookup):
+        date_field, id_field = self.key_fields
+        return (
+            Q(**{f'{date_field}__{lookup}': pub_date})
+            | Q(**{date_field: pub_date, f'{id_field}__{lookup}': post_id})
+        )
+
+    def _ordered(self, descending):
+        prefix = '-' if descending else ''
+        return self.object_list.order_by(
+            *(prefix + field for field in self.key_fields))
+
+    def _build_page(self, rows, has_previous, has_next=None):
+        if has_next is None:
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+        return CursorPage(
+            rows,
+            self,
+            next_cursor=(
+                self._cursor(NEXT, rows[-1])
+                if has_next and rows else None),
+            previous_cursor=(
+                self._cursor(PREVIOUS, rows[0])
+                if has_previous and rows else None),
+        )
+
+    def _cursor(self, direction, row):
+        # Строки - модели или словари из values()
+        if isinstance(row, dict):
+            key = [row[field] for field in self.key_fields]
+        else:
+            key = [getattr(row, field) for field in self.key_fields]
+        return encode_cursor(direction, *key)
+
+
+# Число групп для каталога (posts.views.group_index)
+GROUPS_COUNT_KEY = 'groups_count'
+
+
+def count_key(scope='all', pk=None):
+    """Ключ кэша с числом записей: всех, группы или автора."""
+    if pk is None:
+        return f'posts_count:{scope}'
+    return f'posts_count:{scope}:{pk}'
+
+
+def estimate_count(queryset):
+    """Точное число записей до COUNT_EXACT_LIMIT, дальше - оценка.
+
+    Оценка считает записи выборки равномерно распределёнными по
+    диапазону первичных ключей: плотность берётся по первым
+    COUNT_EXACT_LIMIT ключам.
+    """
+    queryset = queryset.order_by()
+    count = queryset[:COUNT_EXACT_LIMIT].count()
+    if count < COUNT_EXACT_LIMIT:
+        return count
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    edge = queryset.order_by('pk').values_list(
+        'pk', flat=True)[COUNT_EXACT_LIMIT - 1]
+    return int(COUNT_EXACT_LIMIT * (bounds['high'] - bounds['low'] + 1)
+               / (edge - bounds['low'] + 1))
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator с известным заранее числом записей и окном страниц.
+
+    Число записей передаётся готовым (total - денормализованный
+    счётчик) или хранится в кэше под count_key и сбрасывается при
+    создании и удалении записей (posts.signals); без них считается
+    как обычно.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, total=None,
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.total = total
+
+    @cached_property
+    def count(self):
+        if self.total is not None:
+            return self.total
+        if self.count_key is None:
+            return super().count
+        count = cache.get(self.count_key)
+        if count is None:
+            count = estimate_count(self.object_list)
+            cache.set(self.count_key, count, COUNT_TIMEOUT)
+        return count
+
+    def page_window(self, number):
+        """Номера страниц в окне PAGE_WINDOW вокруг текущей."""
+        return range(max(1, number - PAGE_WINDOW),
+                     min(self.num_pages, number + PAGE_WINDOW) + 1)
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для админки: число записей не считается COUNT(*)
+    по всей выборке, а оценивается (estimate_count)."""
+
+    @cached_property
+    def count(self):
+        return estimate_count(self.object_list)
+
+
+def paginator_page(request, post_list, key_fields=('pub_date', 'id'),
+                   count_key=None, total=None):
+    cursor = request.GET.get('cursor')
+    if cursor is not None:
+        return CursorPaginator(
+            post_list, POST_COUNT, key_fields=key_fields).get_page(cursor)
+    paginator = CachedCountPaginator(post_list, POST_COUNT,
+                                     count_key=count_key, total=total)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
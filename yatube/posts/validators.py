@@ -0,0 +1,60 @@
+from django.core.exceptions import ValidationError
+from django.template.defaultfilters import filesizeformat
+from django.utils.formats import number_format
+from django.utils.translation import ngettext
+from PIL import Image
+
+from .settings import IMAGE_MAX_BYTES, IMAGE_MAX_PIXELS
+
+TOO_LARGE = 'Файл больше {}.'
+TOO_MANY_PIXELS = ('Картинка больше %(count)s пикселя.',
+                   'Картинка больше %(count)s пикселей.')
+
+
+def too_many_pixels(limit):
+    """Текст ошибки с точным пределом: мегапиксели округлились бы до
+    нуля у предела меньше миллиона."""
+    limit = int(limit)
+    return ngettext(*TOO_MANY_PIXELS, limit) % {
+        'count': number_format(limit, force_grouping=True)}
+
+
+def image_pixels(file):
+    """Число пикселей по заголовку картинки, без декодирования.
+
+    None, если заголовок не прочитать. DecompressionBombError
+    пропускается: PIL уже счёл картинку слишком большой.
+    """
+    position = file.tell()
+    try:
+        with Image.open(file) as image:
+            width, height = image.size
+    except Image.DecompressionBombError:
+        raise
+    except Exception:
+        return None
+    finally:
+        file.seek(position)
+    return width * height
+
+
+def check_image_limits(file):
+    """Текст ошибки, если файл нарушает пределы, иначе None."""
+    if file.size is not None and file.size > IMAGE_MAX_BYTES:
+        return TOO_LARGE.format(filesizeformat(IMAGE_MAX_BYTES))
+    try:
+        pixels = image_pixels(file)
+    except Image.DecompressionBombError:
+        pixels = None
+    else:
+        if pixels is None or pixels <= IMAGE_MAX_PIXELS:
+            return None
+    return too_many_pixels(IMAGE_MAX_PIXELS)
+
+
+def validate_image_upload(file):
+    """Отклоняет картинку больше IMAGE_MAX_BYTES или IMAGE_MAX_PIXELS
+    до того, как её декодируют целиком (images.normalize, миниатюры)."""
+    error = check_image_limits(file)
+    if error:
+        raise ValidationError(error, code='image_limits')
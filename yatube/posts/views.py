@@ -1,34 +1,125 @@
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.shortcuts import get_object_or_404, render, redirect
 
-from .models import Post, Group, User, Follow
+from core.decorators import query_budget
+
+from . import counters, generations, search, suggestions, tags, trending
+from .models import Post, PostTag, Group, User, Follow
+from .feeds import FollowFeed
 from .forms import PostForm, CommentForm
-from .utils import paginator_page
+from .settings import GROUP_COUNT, POST_COUNT
+from .utils import (GROUPS_COUNT_KEY, CachedCountPaginator, CursorPaginator,
+                    count_key, paginator_page)
 
 
+@query_budget(6)
 def index(request):
     # Все записи
     return render(request, 'posts/index.html', {
         'page_obj': paginator_page(
-            request, Post.objects.select_related('group').all()),
+            request, Post.objects.for_feed(),
+            count_key=count_key()),
+        'generation': generations.get('all'),
+    })
+
+
+@query_budget(5)
+def trending_posts(request):
+    # Популярные записи: готовый список id из кэша (posts.trending)
+    page_obj = CachedCountPaginator(
+        trending.ranked_ids(), POST_COUNT).get_page(request.GET.get('page'))
+    posts = Post.objects.for_feed().in_bulk(page_obj.object_list)
+    page_obj.object_list = [posts[post_id] for post_id in page_obj
+                            if post_id in posts]
+    return render(request, 'posts/trending.html', {
+        'page_obj': page_obj,
+        'trending': True,
+    })
+
+
+def tagged_page(request, kind, name):
+    page_obj = CursorPaginator(
+        tags.tagged(kind, name), POST_COUNT,
+        key_fields=('pub_date', 'post_id'),
+    ).get_page(request.GET.get('cursor'))
+    page_obj.object_list = [entry.post for entry in page_obj]
+    return page_obj
+
+
+@query_budget(5)
+def tag_posts(request, name):
+    # Записи с #тегом: обратный индекс PostTag, страницы - по курсору
+    name = name.lower()
+    return render(request, 'posts/tagged.html', {
+        'page_obj': tagged_page(request, PostTag.TAG, name),
+        'header': f'#{name}',
+    })
+
+
+@query_budget(6)
+def mentions(request, username):
+    # Записи, где упомянут пользователь
+    author = get_object_or_404(User, username=username)
+    return render(request, 'posts/tagged.html', {
+        'page_obj': tagged_page(request, PostTag.MENTION, author.username),
+        'header': f'Упоминания @{author.username}',
+    })
+
+
+@query_budget(5)
+def search_posts(request):
+    # Поиск по тексту записей: по рангу, страницы - по курсору
+    query = request.GET.get('q', '').strip()
+    page_obj = CursorPaginator(
+        search.search(query), POST_COUNT, key_fields=('score', 'id'),
+        key_type=float,
+    ).get_page(request.GET.get('cursor'))
+    return render(request, 'posts/search.html', {
+        'page_obj': page_obj,
+        'query': query,
+    })
+
+
+@query_budget(4)
+def group_index(request):
+    # Каталог групп: число записей и последняя запись хранятся в группе
+    paginator = CachedCountPaginator(
+        Group.objects.select_related('last_post_author').only(
+            'title', 'slug', 'description', 'posts_count', 'last_post_date',
+            'last_post_author__username'),
+        GROUP_COUNT, count_key=GROUPS_COUNT_KEY)
+    return render(request, 'posts/group_index.html', {
+        'page_obj': paginator.get_page(request.GET.get('page')),
+        'generation': generations.get('groups'),
     })
 
 
+@query_budget(6)
 def group_posts(request, slug):
     # Записи группы
     group = get_object_or_404(Group, slug=slug)
     return render(request, 'posts/group_list.html', {
-        'page_obj': paginator_page(request, group.posts.all()),
+        'page_obj': paginator_page(
+            request, group.posts.for_feed(), total=group.posts_count),
         'group': group,
+        'generation': generations.get(f'group:{group.id}'),
     })
 
 
+@query_budget(7)
 def profile(request, username):
     # Профиль пользователя
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username)
+    stats = counters.user_stats(author)
     context = {
-        'page_obj': paginator_page(request, author.posts.all()),
-        'author': author
+        'page_obj': paginator_page(
+            request, author.posts.for_feed(), total=stats.posts_count),
+        'author': author,
+        'stats': stats,
+        'generation': generations.get(f'author:{author.id}'),
+        'suggestions': suggestions.for_user(request.user),
     }
     if not request.user.is_authenticated:
         return render(request, 'posts/profile.html', context)
@@ -39,16 +130,21 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+@query_budget(6)
 def post_detail(request, post_id):
     # Детали записи
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(Post.objects.for_detail(), id=post_id)
     return render(request, 'posts/post_detail.html', {
         'post': post,
-        'comments': post.comments.all(),
+        'mentions': tags.mentioned([post]).get(post.id, ()),
+        'author_stats': counters.user_stats(post.author),
+        'generation': generations.get(f'post:{post.id}'),
+        'comments': post.comments.for_detail(),
         'form': CommentForm(request.POST or None),
     })
 
 
+@query_budget(21)
 @login_required
 def post_create(request):
     # Создание записи
@@ -60,11 +156,13 @@ def post_create(request):
         })
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
-    form.save_m2m()
+    with transaction.atomic():
+        post.save()
+        form.save_m2m()
     return redirect('posts:profile', username=post.author)
 
 
+@query_budget(24)
 @login_required
 def post_edit(request, post_id):
     # Редактирование записи
@@ -79,10 +177,12 @@ def post_edit(request, post_id):
         return render(request, 'posts/create_post.html', {
             'form': form,
         })
-    form.save()
+    with transaction.atomic():
+        form.save()
     return redirect('posts:post_detail', post_id)
 
 
+@query_budget(11)
 @login_required
 def add_comment(request, post_id):
     # Создание комментраия
@@ -92,33 +192,50 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
+            trending.record_comment(comment)
     return redirect('posts:post_detail', post_id=post_id)
 
 
+@query_budget(8)
 @login_required
 def follow_index(request):
     # Посты избранных авторов
-    post_list = Post.objects.filter(
-        author__following__user=request.user)
+    # Первые страницы - слияние кэшированных списков авторов,
+    # глубокие и курсорные - диапазон индекса FeedEntry (posts.feeds)
+    feed = FollowFeed(request.user)
+    if 'cursor' in request.GET:
+        page_obj = paginator_page(request, feed.entries,
+                                  key_fields=('pub_date', 'post_id'))
+        page_obj.object_list = [entry.post for entry in page_obj]
+    else:
+        page_obj = paginator_page(request, feed)
     return render(request, 'posts/follow.html', {
-        'page_obj': paginator_page(request, post_list)})
+        'page_obj': page_obj,
+        'generation': generations.get('all', f'follow:{request.user.id}'),
+        'suggestions': suggestions.for_user(request.user),
+    })
 
 
+@query_budget(13)
 @login_required
 def profile_follow(request, username):
     # Подписаться на автора
     author = get_object_or_404(User, username=username)
     if author == request.user:
         return redirect('posts:profile', username=username)
-    Follow.objects.get_or_create(
-        user=request.user, author=author)
+    with transaction.atomic():
+        Follow.objects.get_or_create(
+            user=request.user, author=author)
     return redirect('posts:profile', username=username)
 
 
+@query_budget(10)
 @login_required
 def profile_unfollow(request, username):
     # Дизлайк, отписка
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author,).delete()
+    with transaction.atomic():
+        Follow.objects.filter(user=request.user, author=author,).delete()
     return redirect('posts:profile', username=username)
@@ -141,6 +141,8 @@ USE_TZ = True
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Загрузки сразу пишутся на диск и обрываются по пределам posts.settings
+FILE_UPLOAD_HANDLERS = ['posts.uploads.BoundedImageUploadHandler']
 
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 STATIC_URL = '/static/'
@@ -150,9 +152,32 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Лимиты запросов (core.middleware.QueryBudgetMiddleware; по умолчанию
+# не подключена - её ставят первой в MIDDLEWARE). Превышение лимита:
+# False - предупреждение в лог, True - исключение
+QUERY_BUDGET_STRICT = False
+# Заголовок Server-Timing со временем и числом запросов к базе; при
+# DEBUG отдаётся всегда
+QUERY_BUDGET_SERVER_TIMING = False
+
 # Кэшеривоние
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# С YATUBE_CACHE_PATH кэш общий для всех воркеров на сервере
+# (core.cache.SQLiteCache), без него - свой у каждого процесса
+CACHE_PATH = os.environ.get('YATUBE_CACHE_PATH')
+if CACHE_PATH:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.SQLiteCache',
+            'LOCATION': CACHE_PATH,
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000,
+                'MAX_SIZE': 256 * 2 ** 20,
+            },
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
     }
-}
@@ -0,0 +1,11 @@
+"""Настройки тестов: manage.py test и pytest."""
+from .settings import *  # noqa: F401,F403
+from .settings import MIDDLEWARE
+
+# Каждый тест представления проверяет объявленный лимит запросов
+MIDDLEWARE = ['core.middleware.QueryBudgetMiddleware', *MIDDLEWARE]
+QUERY_BUDGET_STRICT = True
+
+# Миниатюры готовятся сразу: фоновые потоки писали бы в MEDIA_ROOT уже
+# после конца теста
+THUMBNAIL_WORKERS = 0
@@ -3,6 +3,8 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import media
+
 handler403 = 'core.views.csrf_failure'
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
@@ -15,6 +17,8 @@ urlpatterns = [
     path('about/', include('about.urls', namespace='about')),
 ]
 
+urlpatterns += static(settings.MEDIA_URL, view=media)
+
 
 if settings.DEBUG:
     import debug_toolbar